@@ -0,0 +1,117 @@
+import argparse
+import timeit
+import json
+import sys
+import os
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from src.extractor import LatexIngestor
+from src.registry import summarizers_dict
+
+
+
+#==============================================================================================================
+# CPU INFERENCE BACKEND BENCHMARK
+# Resume as seções de um artigo com cada backend (eager fp32, int8, onnx, compile) e compara
+# latência e concordância das saídas com o fp32 (referência).
+# Uso: python benchmarks/bench_backends.py --model bart --backends eager int8 onnx --threads 4 example/<artigo>/main.tex
+def secoes_do_artigo(caminho, max_secoes):
+    ingestor = LatexIngestor()
+    analise = ingestor.analisar_projeto(caminho)
+    secoes = ingestor.extrair_secoes(analise)
+    return [s['conteudo'] for s in secoes[:max_secoes]]
+
+def _palavras(texto):
+    return texto.lower().split()
+
+def f1_unigramas(referencia, candidato):
+    # ROUGE-1 F1 simplificado: sobreposição de palavras entre as duas saídas
+    ref, cand = _palavras(referencia), _palavras(candidato)
+    if not ref or not cand:
+        return float(ref == cand)
+    contagem = {}
+    for p in ref:
+        contagem[p] = contagem.get(p, 0) + 1
+    comuns = 0
+    for p in cand:
+        if contagem.get(p, 0) > 0:
+            contagem[p] -= 1
+            comuns += 1
+    if comuns == 0:
+        return 0.0
+    precisao, revocacao = comuns / len(cand), comuns / len(ref)
+    return 2 * precisao * revocacao / (precisao + revocacao)
+
+def medir(modelo, backend, textos, threads, repeticoes):
+    start = timeit.default_timer()
+    summarizer = summarizers_dict[modelo](device="cpu", backend=backend, num_threads=threads)
+    carga = timeit.default_timer() - start
+    # Aquecimento: a primeira chamada paga compilação / criação das sessões
+    start = timeit.default_timer()
+    saidas = summarizer.summarize_batch(textos[:1])
+    aquecimento = timeit.default_timer() - start
+    tempos = []
+    for _ in range(repeticoes):
+        start = timeit.default_timer()
+        saidas = summarizer.summarize_batch(textos)
+        tempos.append(timeit.default_timer() - start)
+    tempos.sort()
+    return {
+        "backend": backend,
+        "carga_s": carga,
+        "aquecimento_s": aquecimento,
+        "mediana_s": tempos[len(tempos) // 2],
+        "por_secao_s": tempos[len(tempos) // 2] / len(textos),
+    }, saidas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara backends de inferência em CPU")
+    parser.add_argument("input", help="artigo .tex usado como carga de trabalho")
+    parser.add_argument("--model", default="bart")
+    parser.add_argument("--backends", nargs="+", default=["eager", "int8", "onnx", "compile"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--secoes", type=int, default=8, help="número máximo de seções resumidas")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--json", default=None, help="arquivo para salvar os resultados")
+    args = parser.parse_args(argv)
+
+    textos = secoes_do_artigo(args.input, args.secoes)
+    if not textos:
+        print("Nenhuma seção encontrada.", file=sys.stderr)
+        return 1
+
+    backends = ["eager"] + [b for b in args.backends if b != "eager"]
+    referencia = None
+    resultados = []
+    for backend in backends:
+        try:
+            resultado, saidas = medir(args.model, backend, textos, args.threads, args.repeticoes)
+        except (ImportError, RuntimeError, ValueError) as exc:
+            print(f"[PULADO] {backend}: {exc}")
+            continue
+        # summarize_batch returns the bullet points of each section: compared as a single text
+        saidas = [' '.join(topicos) for topicos in saidas]
+        if referencia is None:
+            referencia = saidas
+        pares = list(zip(referencia, saidas))
+        resultado["iguais_ao_fp32"] = sum(r == s for r, s in pares) / len(pares)
+        resultado["f1_vs_fp32"] = sum(f1_unigramas(r, s) for r, s in pares) / len(pares)
+        resultados.append(resultado)
+        base = resultados[0]["mediana_s"]
+        print(f"{backend:>8}: {resultado['por_secao_s']*1000:8.1f} ms/seção  (x{base / resultado['mediana_s']:.2f})"
+              f"  carga {resultado['carga_s']:.1f}s  iguais {resultado['iguais_ao_fp32']:.0%}"
+              f"  F1 {resultado['f1_vs_fp32']:.3f}")
+
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "backends", "model": args.model, "threads": args.threads,
+                       "secoes": len(textos), "resultados": resultados}, f, indent=1)
+    return 0
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    sys.exit(main())
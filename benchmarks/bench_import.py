@@ -0,0 +1,69 @@
+import subprocess
+import argparse
+import json
+import sys
+import os
+
+
+
+#==============================================================================================================
+# IMPORT-TIME BENCHMARK
+# Mede, em processos novos, quanto custa importar os módulos de entrada do Beamifier e garante
+# que nenhuma dependência pesada é carregada só pelo import.
+# Uso: python benchmarks/bench_import.py [--repeticoes 10] [--limite 0.5] [--json saida.json]
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = ["src.pipeline", "src.cli", "src.summarizer"]
+PROIBIDOS = ["torch", "transformers", "google.generativeai", "numpy"]
+
+_SCRIPT = """
+import sys, time, json
+inicio = time.perf_counter()
+import {modulo}
+tempo = time.perf_counter() - inicio
+print(json.dumps({{"tempo": tempo, "carregados": [m for m in {proibidos!r} if m in sys.modules]}}))
+"""
+
+def medir(modulo, repeticoes):
+    tempos = []
+    carregados = set()
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, "-c", _SCRIPT.format(modulo=modulo, proibidos=PROIBIDOS)],
+                               cwd=RAIZ, capture_output=True, text=True, check=True)
+        dados = json.loads(saida.stdout.strip().splitlines()[-1])
+        tempos.append(dados["tempo"])
+        carregados.update(dados["carregados"])
+    tempos.sort()
+    return {
+        "modulo": modulo,
+        "mediana_s": tempos[len(tempos) // 2],
+        "min_s": tempos[0],
+        "max_s": tempos[-1],
+        "dependencias_pesadas": sorted(carregados),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do tempo de import do Beamifier")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--limite", type=float, default=0.5, help="tempo máximo (mediana, s) aceitável por módulo")
+    parser.add_argument("--json", default=None, help="arquivo para salvar os resultados")
+    args = parser.parse_args(argv)
+
+    resultados = [medir(modulo, args.repeticoes) for modulo in MODULOS]
+    regressao = False
+    for r in resultados:
+        falhou = r["dependencias_pesadas"] or r["mediana_s"] > args.limite
+        regressao = regressao or bool(falhou)
+        print(f"[{'FALHA' if falhou else 'OK   '}] import {r['modulo']}: mediana {r['mediana_s']*1000:.1f} ms"
+              + (f" (carregou {', '.join(r['dependencias_pesadas'])})" if r["dependencias_pesadas"] else ""))
+
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "import", "limite_s": args.limite, "resultados": resultados}, f, indent=1)
+    return 1 if regressao else 0
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    sys.exit(main())
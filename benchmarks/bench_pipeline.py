@@ -0,0 +1,151 @@
+import tracemalloc
+import statistics
+import tempfile
+import argparse
+import logging
+import timeit
+import json
+import sys
+import os
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.corpus import Gerador_Corpus
+from src.extractor import LatexIngestor
+from src.loader import ProjectLoader
+from src.to_Beamer import BeamerBuilder
+from src.pipeline import Beamifier_Pipeline
+from src.summarizer import stub_summarizer
+
+
+
+#==============================================================================================================
+# OFFLINE PIPELINE BENCHMARK
+# Mede tempo e memória (pico do tracemalloc) de LatexIngestor, BeamerBuilder e do pipeline
+# completo (com o summarizer 'stub') em corpora sintéticos de tamanho crescente.
+# Tudo roda sem rede e sem modelos; os corpora são gerados com semente fixa.
+# Uso: python benchmarks/bench_pipeline.py [--secoes 8 32 128] [--json saida.json] [--base anterior.json]
+ESTAGIOS = ("ingestor", "builder", "pipeline")
+
+def _limpar_caches():
+    # Mede sempre a execução "fria": sem o cache de arquivos do loader e de assets do builder
+    ProjectLoader.limpar_cache()
+    BeamerBuilder._cache_assets.clear()
+
+def _ingerir(caminho):
+    ingestor = LatexIngestor()
+    analise = ingestor.analisar_projeto(caminho)
+    return ingestor.extrair_secoes(analise), ingestor.extrair_metadados(analise)
+
+def _slides(secoes):
+    summarizer = stub_summarizer()
+    return [
+        {"titulo": s['titulo'], "conteudo": summarizer.summarize(s['conteudo']), "assets": s.get("assets", [])}
+        for s in secoes
+    ]
+
+def medir(funcao, repeticoes):
+    """
+    Mediana do tempo em `repeticoes` execuções e pico de memória de uma execução extra
+    (tracemalloc deixa o código mais lento, então não entra na medida de tempo).
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        _limpar_caches()
+        start = timeit.default_timer()
+        funcao()
+        tempos.append(timeit.default_timer() - start)
+    _limpar_caches()
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"mediana_s": statistics.median(tempos), "min_s": min(tempos), "pico_bytes": pico}
+
+def bench_tamanho(diretorio, secoes, args):
+    gerador = Gerador_Corpus(secoes=secoes, palavras=args.palavras, profundidade=args.profundidade,
+                             densidade_figuras=args.figuras, densidade_tabelas=args.tabelas,
+                             proporcao_comentarios=args.comentarios, semente=args.semente)
+    projeto = os.path.join(diretorio, f"corpus_{secoes}")
+    caminho = gerador.gerar(projeto)
+    tamanho = sum(os.path.getsize(os.path.join(raiz, f)) for raiz, _, arquivos in os.walk(projeto) for f in arquivos)
+
+    secoes_extraidas, metadados = _ingerir(caminho)
+    slides = _slides(secoes_extraidas)
+    saida = os.path.join(projeto, "saida_beamer.tex")
+    pipeline = Beamifier_Pipeline("stub")
+
+    return {
+        "secoes": secoes,
+        "bytes_fonte": tamanho,
+        "ingestor": medir(lambda: _ingerir(caminho), args.repeticoes),
+        "builder": medir(lambda: BeamerBuilder().montar_apresentacao_completa(slides, saida, metadados=metadados),
+                         args.repeticoes),
+        "pipeline": medir(lambda: pipeline.run(caminho, saida), args.repeticoes),
+    }
+
+def comparar(resultados, base, tolerancia):
+    """
+    Compara o melhor tempo de cada (tamanho, estágio) com o de um resultado anterior
+    (o mínimo é menos sensível a ruído da máquina do que a mediana).
+    Retorna a lista de regressões acima da tolerância (fração).
+    """
+    anteriores = {(r["secoes"], estagio): r[estagio] for r in base["resultados"] for estagio in ESTAGIOS if estagio in r}
+    regressoes = []
+    for r in resultados:
+        for estagio in ESTAGIOS:
+            anterior = anteriores.get((r["secoes"], estagio))
+            if anterior is None:
+                continue
+            razao = r[estagio]["min_s"] / anterior["min_s"]
+            if razao > 1 + tolerancia:
+                regressoes.append(f"{estagio} com {r['secoes']} seções: {razao:.2f}x mais lento")
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline do Beamifier com corpus sintético")
+    parser.add_argument("--secoes", type=int, nargs="+", default=[8, 32, 128], help="tamanhos (número de seções)")
+    parser.add_argument("--palavras", type=int, default=400, help="palavras por seção")
+    parser.add_argument("--profundidade", type=int, default=2, help="níveis de \\input aninhados por seção")
+    parser.add_argument("--figuras", type=float, default=0.3, help="figuras por seção")
+    parser.add_argument("--tabelas", type=float, default=0.2, help="tabelas por seção")
+    parser.add_argument("--comentarios", type=float, default=0.1, help="fração de linhas de comentário")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--json", default=None, help="arquivo para salvar os resultados")
+    parser.add_argument("--base", default=None, help="resultado anterior (--json) para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora aceitável em relação à base")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO) # Silencia o log de progresso do pipeline
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix="beamifier-bench-") as diretorio:
+        for secoes in args.secoes:
+            r = bench_tamanho(diretorio, secoes, args)
+            resultados.append(r)
+            print(f"{secoes:>5} seções ({r['bytes_fonte'] / 1024:.0f} KiB): "
+                  + "  ".join(f"{estagio} {r[estagio]['mediana_s']*1000:.1f} ms / {r[estagio]['pico_bytes'] / 2**20:.1f} MiB"
+                              for estagio in ESTAGIOS))
+
+    configuracao = {k: v for k, v in vars(args).items() if k not in ("json", "base", "tolerancia")}
+    if args.json is not None:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "pipeline", "configuracao": configuracao, "resultados": resultados}, f, indent=1)
+
+    if args.base is not None:
+        with open(args.base, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(resultados, base, args.tolerancia)
+        for regressao in regressoes:
+            print(f"[REGRESSÃO] {regressao}")
+        return 1 if regressoes else 0
+    return 0
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    sys.exit(main())
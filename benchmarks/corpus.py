@@ -0,0 +1,187 @@
+import argparse
+import random
+import sys
+import os
+
+
+
+#==============================================================================================================
+# SYNTHETIC LATEX CORPUS
+# Gera projetos LaTeX determinísticos (mesma semente -> mesmos arquivos) no formato dos artigos
+# de example/: preâmbulo, título/autor, abstract, seções com figuras, tabelas, comentários e
+# \input aninhados, e bibliografia.
+# Uso: python benchmarks/corpus.py saida/ --secoes 40 --palavras 600 --profundidade 2
+_VOCABULARIO = (
+    "object detection model network training dataset classroom accuracy inference latency "
+    "precision recall feature layer convolution image frame student camera pipeline result "
+    "method baseline experiment evaluation metric architecture backbone anchor threshold "
+    "performance analysis approach system real time deep learning vision benchmark score"
+).split()
+
+PREAMBULO = r"""\documentclass[conference]{IEEEtran}
+\usepackage{cite}
+\usepackage{amsmath,amssymb,amsfonts}
+\usepackage{graphicx}
+\usepackage{xcolor}
+\begin{document}
+
+\title{%s}
+\author{\IEEEauthorblockN{Autor Sintético}
+\IEEEauthorblockA{\textit{Universidade Sintética} \\
+autor@exemplo.br}
+}
+
+\maketitle
+
+\begin{abstract}
+%s
+\end{abstract}
+
+"""
+
+FIM = r"""
+\bibliographystyle{IEEEtran}
+\bibliography{referencias}
+
+\end{document}
+"""
+
+
+class Gerador_Corpus:
+    def __init__(self, secoes=8, palavras=400, profundidade=1, densidade_figuras=0.3,
+                 densidade_tabelas=0.2, proporcao_comentarios=0.1, semente=0):
+        self.secoes = secoes
+        self.palavras = palavras                            # palavras de texto por seção
+        self.profundidade = profundidade                    # níveis de \input aninhados por seção
+        self.densidade_figuras = densidade_figuras          # figuras por seção (média)
+        self.densidade_tabelas = densidade_tabelas          # tabelas por seção (média)
+        self.proporcao_comentarios = proporcao_comentarios  # fração das linhas que são comentários
+        self.semente = semente
+
+    def _frase(self, rng):
+        words = [rng.choice(_VOCABULARIO) for _ in range(rng.randint(8, 22))]
+        words[0] = words[0].capitalize()
+        # Um pouco de marcação inline, como nos artigos reais
+        if rng.random() < 0.2:
+            k = rng.randrange(len(words))
+            words[k] = r"\textit{" + words[k] + "}"
+        if rng.random() < 0.1:
+            words.append(r"\cite{ref%d}" % rng.randint(1, 30))
+        return ' '.join(words) + '.'
+
+    def _paragrafos(self, rng, n_palavras):
+        linhas = []
+        paragrafo, total = [], 0
+        while total < n_palavras:
+            frase = self._frase(rng)
+            paragrafo.append(frase)
+            total += len(frase.split())
+            if rng.random() < self.proporcao_comentarios:
+                linhas.append("% " + self._frase(rng))
+            if len(paragrafo) >= rng.randint(3, 6):
+                linhas.append(' '.join(paragrafo))
+                linhas.append("")
+                paragrafo = []
+        if paragrafo:
+            linhas.append(' '.join(paragrafo))
+        return linhas
+
+    def _quantidade(self, rng, densidade):
+        # Parte inteira sempre, parte fracionária com essa probabilidade
+        return int(densidade) + (rng.random() < densidade - int(densidade))
+
+    def _figura(self, rng, n):
+        return [
+            r"\begin{figure}[htbp]",
+            r"\centering",
+            r"\includegraphics[width=3.4in]{figuras/figura_%d.png}" % n,
+            r"\caption{%s}" % self._frase(rng),
+            r"\label{fig:%d}" % n,
+            r"\end{figure}",
+        ]
+
+    def _tabela(self, rng, n):
+        colunas = rng.randint(3, 6)
+        linhas = [
+            r"\begin{table}[htbp]",
+            r"\caption{%s}" % self._frase(rng),
+            r"\begin{center}",
+            r"\begin{tabular}{|%s|}" % '|'.join('c' * colunas),
+            r"\hline",
+        ]
+        for _ in range(rng.randint(3, 8)):
+            linhas.append(' & '.join(f"{rng.uniform(0, 100):.2f}" for _ in range(colunas)) + r" \\")
+        linhas += [r"\hline", r"\end{tabular}", r"\label{tab:%d}" % n, r"\end{center}", r"\end{table}"]
+        return linhas
+
+    def _corpo_secao(self, rng, contadores):
+        linhas = self._paragrafos(rng, self.palavras)
+        for _ in range(self._quantidade(rng, self.densidade_figuras)):
+            contadores["figuras"] += 1
+            posicao = rng.randint(0, len(linhas))
+            linhas[posicao:posicao] = self._figura(rng, contadores["figuras"])
+        for _ in range(self._quantidade(rng, self.densidade_tabelas)):
+            contadores["tabelas"] += 1
+            posicao = rng.randint(0, len(linhas))
+            linhas[posicao:posicao] = self._tabela(rng, contadores["tabelas"])
+        return linhas
+
+    def gerar(self, diretorio):
+        """
+        Escreve o projeto em `diretorio` e retorna o caminho do main.tex.
+        Cada seção fica em secoes/secao_<i>.tex; com profundidade > 1 o texto é repartido
+        em uma cadeia de \\input (secao_<i>_1.tex, secao_<i>_2.tex, ...).
+        """
+        rng = random.Random(self.semente)
+        os.makedirs(os.path.join(diretorio, "secoes"), exist_ok=True)
+        contadores = {"figuras": 0, "tabelas": 0}
+
+        main = [PREAMBULO % ("Synthetic Benchmark Paper", ' '.join(self._frase(rng) for _ in range(6)))]
+        for i in range(1, self.secoes + 1):
+            titulo = ' '.join(rng.choice(_VOCABULARIO) for _ in range(rng.randint(1, 4))).title()
+            corpo = self._corpo_secao(rng, contadores)
+            if self.profundidade <= 0:
+                main.append("\\section{%s}\n" % titulo + '\n'.join(corpo) + "\n")
+                continue
+            main.append("%% Seção %d\n\\input{secoes/secao_%d}\n" % (i, i))
+            # Repartição do corpo ao longo da cadeia de \input
+            passo = -(-len(corpo) // self.profundidade)
+            partes = [corpo[k:k + passo] for k in range(0, len(corpo), passo)] or [[]]
+            for nivel, parte in enumerate(partes):
+                nome = f"secao_{i}" if nivel == 0 else f"secao_{i}_{nivel}"
+                conteudo = ("\\section{%s}\n" % titulo if nivel == 0 else "") + '\n'.join(parte) + "\n"
+                if nivel + 1 < len(partes):
+                    conteudo += "\\input{secoes/secao_%d_%d}\n" % (i, nivel + 1)
+                with open(os.path.join(diretorio, "secoes", nome + ".tex"), "w", encoding="utf-8") as f:
+                    f.write(conteudo)
+        main.append(FIM)
+
+        caminho = os.path.join(diretorio, "main.tex")
+        with open(caminho, "w", encoding="utf-8") as f:
+            f.write('\n'.join(main))
+        return caminho
+#==============================================================================================================
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um projeto LaTeX sintético")
+    parser.add_argument("diretorio")
+    parser.add_argument("--secoes", type=int, default=8)
+    parser.add_argument("--palavras", type=int, default=400, help="palavras por seção")
+    parser.add_argument("--profundidade", type=int, default=1, help="níveis de \\input aninhados por seção")
+    parser.add_argument("--figuras", type=float, default=0.3, help="figuras por seção")
+    parser.add_argument("--tabelas", type=float, default=0.2, help="tabelas por seção")
+    parser.add_argument("--comentarios", type=float, default=0.1, help="fração de linhas de comentário")
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    gerador = Gerador_Corpus(args.secoes, args.palavras, args.profundidade, args.figuras,
+                             args.tabelas, args.comentarios, args.semente)
+    print(gerador.gerar(args.diretorio))
+    return 0
+
+
+
+if __name__=='__main__':
+    sys.exit(main())
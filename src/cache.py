@@ -0,0 +1,259 @@
+from src.instrumentation import ativo
+
+import threading
+import tempfile
+import hashlib
+import sqlite3
+import json
+import time
+import os
+
+
+
+# Raiz de todos os caches do Beamifier (resumos, documentos, gráficos, formatos, onnx)
+CACHE_DIR_PADRAO = os.path.join(os.path.expanduser("~"), ".cache", "beamifier")
+
+
+
+def escrever_atomico(caminho, conteudo):
+    """
+    Grava `conteudo` (bytes) em `caminho` por um temporário no mesmo diretório + os.replace:
+    outros processos (run_many) veem o arquivo antigo ou o novo inteiro, nunca um pela metade.
+    """
+    diretorio = os.path.dirname(caminho) or '.'
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(suffix=".tmp", dir=diretorio)
+    try:
+        with os.fdopen(descritor, 'wb') as f:
+            f.write(conteudo)
+        os.chmod(temporario, 0o644) # mkstemp cria o arquivo só para o dono
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+#==============================================================================================================
+# PERSISTENT SUMMARY CACHE
+# SQLite em modo WAL: seguro para vários processos lendo/escrevendo ao mesmo tempo.
+# Leituras não pegam o lock de escrita: o último acesso (para o LRU) só é regravado quando está
+# mais velho que INTERVALO_ACESSO, e essas atualizações vão em lote na próxima escrita.
+# O tamanho total fica em uma linha de metadados, atualizada a cada inserção/remoção.
+class SummaryCache:
+    INTERVALO_ACESSO = 3600.0   # segundos: precisão do LRU
+    MAX_ACESSOS_PENDENTES = 64
+
+    def __init__(self, path=None, max_bytes=256 * 1024 * 1024):
+        if path is None:
+            path = os.path.join(CACHE_DIR_PADRAO, "resumos.sqlite3")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._acessos = {}      # chave -> último acesso ainda não gravado
+        self._local = threading.local()
+        diretorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(diretorio, exist_ok=True)
+        with self._conexao() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS resumos (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS idx_acesso ON resumos (ultimo_acesso)")
+            con.execute("CREATE TABLE IF NOT EXISTS meta (nome TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+            # Caches criados antes da linha de metadados: soma uma única vez
+            con.execute("INSERT OR IGNORE INTO meta (nome, valor) "
+                        "SELECT 'total_bytes', COALESCE(SUM(tamanho), 0) FROM resumos")
+
+    def __getstate__(self):
+        # Conexões não são serializáveis (ex.: envio para workers do run_many)
+        estado = self.__dict__.copy()
+        del estado['_local'], estado['_lock']
+        estado['_acessos'] = {}
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _con(self):
+        # Uma conexão por thread e por processo (conexões não sobrevivem a um fork)
+        con = getattr(self._local, 'con', None)
+        if con is None or self._local.pid != os.getpid():
+            con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+            self._local.pid = os.getpid()
+        return con
+
+    def _conexao(self):
+        # Transação de escrita
+        return _Transacao(self._con())
+
+    @staticmethod
+    def chave(model_name, prompt_template, max_length, min_length, text):
+        h = hashlib.sha256()
+        for parte in (model_name, prompt_template or "", str(max_length), str(min_length)):
+            h.update(parte.encode('utf-8'))
+            h.update(b'\0')
+        h.update(hashlib.sha256(text.encode('utf-8')).digest())
+        return h.hexdigest()
+
+    def get(self, chave):
+        # Leitura simples (sem transação de escrita): hits não se serializam entre processos
+        linha = self._con().execute("SELECT valor, ultimo_acesso FROM resumos WHERE chave = ?", (chave,)).fetchone()
+        if linha is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        agora = time.time()
+        with self._lock:
+            self.hits += 1
+            if agora - linha[1] >= self.INTERVALO_ACESSO:
+                self._acessos[chave] = agora
+            gravar = len(self._acessos) >= self.MAX_ACESSOS_PENDENTES
+        if gravar:
+            with self._conexao() as con:
+                self._gravar_acessos(con)
+        return json.loads(linha[0])
+
+    def _gravar_acessos(self, con):
+        with self._lock:
+            acessos, self._acessos = self._acessos, {}
+        if acessos:
+            con.executemany("UPDATE resumos SET ultimo_acesso = ? WHERE chave = ?",
+                            [(quando, chave) for chave, quando in acessos.items()])
+
+    def _somar_total(self, con, delta):
+        con.execute("UPDATE meta SET valor = valor + ? WHERE nome = 'total_bytes'", (delta,))
+
+    def put(self, chave, topicos):
+        valor = json.dumps(topicos, ensure_ascii=False)
+        tamanho = len(valor.encode('utf-8')) + len(chave)
+        with self._conexao() as con:
+            self._gravar_acessos(con)
+            anterior = con.execute("SELECT tamanho FROM resumos WHERE chave = ?", (chave,)).fetchone()
+            con.execute(
+                "INSERT OR REPLACE INTO resumos (chave, valor, tamanho, ultimo_acesso) VALUES (?, ?, ?, ?)",
+                (chave, valor, tamanho, time.time())
+            )
+            self._somar_total(con, tamanho - (anterior[0] if anterior is not None else 0))
+            self._evict(con)
+
+    def _total(self, con):
+        return con.execute("SELECT valor FROM meta WHERE nome = 'total_bytes'").fetchone()[0]
+
+    def _evict(self, con):
+        # LRU: remove os acessos mais antigos até voltar ao limite de tamanho
+        total = self._total(con)
+        if total <= self.max_bytes:
+            return
+        excesso = total - self.max_bytes
+        removidas, liberados = [], 0
+        for chave, tamanho in con.execute("SELECT chave, tamanho FROM resumos ORDER BY ultimo_acesso"):
+            removidas.append((chave,))
+            liberados += tamanho
+            if liberados >= excesso:
+                break
+        con.executemany("DELETE FROM resumos WHERE chave = ?", removidas)
+        self._somar_total(con, -liberados)
+
+    def estatisticas(self):
+        con = self._con()
+        entradas = con.execute("SELECT COUNT(*) FROM resumos").fetchone()[0]
+        total = self._total(con)
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entradas": entradas, "bytes": total}
+
+    def limpar(self):
+        with self._conexao() as con:
+            con.execute("DELETE FROM resumos")
+            con.execute("UPDATE meta SET valor = 0 WHERE nome = 'total_bytes'")
+            with self._lock:
+                self._acessos.clear()
+
+
+class _Transacao:
+    # BEGIN IMMEDIATE evita que dois processos disputem o upgrade de leitura para escrita
+    def __init__(self, con):
+        self.con = con
+    def __enter__(self):
+        self.con.execute("BEGIN IMMEDIATE")
+        return self.con
+    def __exit__(self, exc_type, exc, tb):
+        self.con.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+#==============================================================================================================
+
+
+
+#==============================================================================================================
+# CACHED SUMMARIZER
+# Fica na frente de qualquer summarizer de summarizer.py (mesma interface)
+class Cached_Summarizer:
+    def __init__(self, model, cache=None):
+        if cache is None or isinstance(cache, str):
+            cache = SummaryCache(cache)
+        self.model = model
+        self.cache = cache
+
+    def __getattr__(self, nome):
+        if nome == 'model':
+            raise AttributeError(nome)
+        return getattr(self.model, nome)
+
+    def _chave(self, text, max_length, min_length, prompt):
+        if prompt is None:
+            prompt = getattr(self.model, 'prompt_template', None)
+        return self.cache.chave(self.model.model_name, prompt, max_length, min_length, text)
+
+    def _armazenar(self, chave, topicos):
+        # Não congela respostas de erro da API no cache
+        falha = getattr(self.model, 'mensagem_falha', None)
+        if falha is not None and topicos == [falha]:
+            return
+        self.cache.put(chave, topicos)
+
+    def summarize(self, text, max_length=130, min_length=30, prompt=None, **kwargs):
+        if prompt is not None:
+            kwargs['prompt'] = prompt
+        chave = self._chave(text, max_length, min_length, prompt)
+        topicos = self.cache.get(chave)
+        ativo().contar("cache_hits" if topicos is not None else "cache_misses")
+        if topicos is None:
+            topicos = self.model.summarize(text, max_length, min_length, **kwargs)
+            self._armazenar(chave, topicos)
+        return topicos
+
+    def summarize_batch(self, texts, max_length=130, min_length=30, prompt=None, **kwargs):
+        """
+        Busca cada seção no cache e envia ao modelo, em um único lote, apenas as que faltam.
+        """
+        if prompt is not None:
+            kwargs['prompt'] = prompt
+        chaves = [self._chave(text, max_length, min_length, prompt) for text in texts]
+        results = [self.cache.get(chave) for chave in chaves]
+        faltantes = [i for i, topicos in enumerate(results) if topicos is None]
+        tracer = ativo()
+        tracer.contar("cache_hits", len(texts) - len(faltantes))
+        tracer.contar("cache_misses", len(faltantes))
+        if faltantes:
+            novos = self.model.summarize_batch([texts[i] for i in faltantes], max_length, min_length, **kwargs)
+            for i, topicos in zip(faltantes, novos):
+                results[i] = topicos
+                self._armazenar(chaves[i], topicos)
+        return results
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
@@ -0,0 +1,136 @@
+from src.pipeline import Beamifier_Pipeline
+from src.routing import Routing_Policy
+
+import argparse
+import logging
+import glob
+import sys
+import os
+import re
+
+
+
+#==============================================================================================================
+# COMMAND LINE INTERFACE
+# Ex.: python -m src.cli --model bart --workers 4 --output-dir example/outputs example/
+_DOCUMENTCLASS = re.compile(r'\\documentclass\s*(?:\[[^\]]*\])?\s*\{([^}]*)\}')
+
+def _eh_documento_principal(caminho):
+    # Artigos com \documentclass; apresentações Beamer (as geradas pelo Beamifier) ficam de fora
+    with open(caminho, 'r', encoding='utf-8', errors='ignore') as f:
+        match = _DOCUMENTCLASS.search(f.read())
+    return match is not None and match.group(1).strip() != 'beamer'
+
+def _dentro(caminho, diretorio):
+    caminho, diretorio = os.path.abspath(caminho), os.path.abspath(diretorio)
+    return os.path.commonpath([caminho, diretorio]) == diretorio
+
+def coletar_entradas(caminhos, ignorar=None):
+    """
+    Expande diretórios em todos os .tex (recursivamente) que contenham \\documentclass,
+    ignorando arquivos gerados pelo próprio Beamifier e o diretório `ignorar` (o de saída).
+    """
+    entradas = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            candidatos = sorted(glob.glob(os.path.join(caminho, '**', '*.tex'), recursive=True))
+            entradas.extend(c for c in candidatos
+                            if not c.endswith('_beamer.tex') and not (ignorar is not None and _dentro(c, ignorar))
+                            and _eh_documento_principal(c))
+        else:
+            entradas.append(caminho)
+    return entradas
+
+def caminhos_saida(inputs, output_dir, modelname):
+    """
+    Mesmo padrão do test.py (<pasta do artigo>_<modelo>.tex). Se duas entradas têm a mesma pasta,
+    o nome vem do caminho relativo à pasta comum (ex.: artigos/a/main.tex -> a_main_<modelo>.tex).
+    Levanta ValueError se ainda assim dois nomes coincidirem (os workers sobrescreveriam a saída).
+    """
+    abs_inputs = [os.path.abspath(i) for i in inputs]
+    nomes = [os.path.basename(os.path.dirname(i)) for i in abs_inputs]
+    if len(set(nomes)) != len(nomes):
+        raiz = os.path.commonpath([os.path.dirname(i) for i in abs_inputs])
+        nomes = [os.path.splitext(os.path.relpath(i, raiz))[0].replace(os.sep, '_') for i in abs_inputs]
+    vistos = {}
+    for entrada, nome in zip(inputs, nomes):
+        if nome in vistos:
+            raise ValueError(f"{vistos[nome]} e {entrada} gerariam a mesma saída ({nome}_{modelname}.tex)")
+        vistos[nome] = entrada
+    return [os.path.join(output_dir, f'{nome}_{modelname}.tex') for nome in nomes]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="beamifier", description="Converte artigos LaTeX em apresentações Beamer.")
+    parser.add_argument("inputs", nargs="+", help="arquivos .tex ou diretórios com artigos")
+    parser.add_argument("--model", required=True, help="identificador do summarizer (ver summarizers_dict)")
+    parser.add_argument("--output-dir", default=None, help="diretório de saída (padrão: ao lado de cada entrada)")
+    parser.add_argument("--workers", type=int, default=None, help="número de processos (padrão: número de CPUs)")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--api-key", default=os.environ.get('API_KEY'))
+    parser.add_argument("--compile", action="store_true", help="compila o .tex gerado com pdflatex")
+    parser.add_argument("--keep-trash", action="store_true", help="mantém os arquivos auxiliares da compilação")
+    parser.add_argument("--cache", default=None, help="caminho do cache de resumos")
+    parser.add_argument("--documents", action="store_true",
+                        help="salva os artigos analisados e os reaproveita enquanto o fonte não muda")
+    parser.add_argument("--documents-dir", default=None, metavar="DIR",
+                        help="diretório dos artigos analisados (implica --documents)")
+    parser.add_argument("--backend", default=None, choices=["eager", "int8", "onnx", "compile"],
+                        help="backend de inferência dos modelos transformers")
+    parser.add_argument("--threads", type=int, default=None, help="threads de inferência por worker")
+    parser.add_argument("--pack", action="store_true",
+                        help="modelos de API: várias seções por requisição (menos chamadas contra o limite de RPM)")
+    parser.add_argument("--timeout", type=float, default=None, help="modelos de API: prazo de cada chamada (segundos)")
+    parser.add_argument("--hedge", type=float, default=None, metavar="PERCENTIL",
+                        help="modelos de API: repete a chamada que passar desse percentil de latência (ex.: 95)")
+    parser.add_argument("--route-below", type=int, default=None, metavar="PALAVRAS",
+                        help="seções com menos palavras (e agradecimentos) vão para o resumo extrativo, sem o modelo")
+    parser.add_argument("--reduce-graphics", action="store_true",
+                        help="reduz as imagens das figuras para a resolução do slide (precisa do Pillow)")
+    parser.add_argument("--trace", action="store_true", help="salva um trace (Chrome/Perfetto) ao lado de cada saída")
+    parser.add_argument("-q", "--quiet", action="store_true", help="mostra só avisos e erros")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s")
+
+    inputs = coletar_entradas(args.inputs, ignorar=args.output_dir)
+    if not inputs:
+        print("Nenhum documento encontrado.", file=sys.stderr)
+        return 1
+
+    outputs = None
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        try:
+            outputs = caminhos_saida(inputs, args.output_dir, args.model)
+        except ValueError as exc:
+            print(f"Saídas em conflito: {exc}", file=sys.stderr)
+            return 1
+
+    model_kwargs = {}
+    if args.backend is not None: model_kwargs["backend"] = args.backend
+    if args.threads is not None: model_kwargs["num_threads"] = args.threads
+    if args.pack: model_kwargs["pacote"] = True
+    if args.timeout is not None: model_kwargs["timeout"] = args.timeout
+    if args.hedge is not None: model_kwargs["hedge_percentil"] = args.hedge
+
+    pipeline = Beamifier_Pipeline(model=args.model, device=args.device, api_key=args.api_key,
+                                  _compile=args.compile, remove_trash=not args.keep_trash, cache=args.cache,
+                                  model_kwargs=model_kwargs, trace=args.trace, graficos=args.reduce_graphics,
+                                  documentos=args.documents_dir or args.documents or None,
+                                  roteamento=Routing_Policy(max_palavras=args.route_below) if args.route_below else None)
+    resultados = pipeline.run_many(inputs, outputs, workers=args.workers)
+
+    falhas = [r for r in resultados if not r["sucesso"]]
+    print(f"\n=== Lote concluído: {len(resultados) - len(falhas)}/{len(resultados)} documentos ===")
+    for r in resultados:
+        status = "OK   " if r["sucesso"] else "FALHA"
+        print(f"[{status}] {r['input']} -> {r['output']} ({r['tempo']}s)")
+    for r in falhas:
+        print(f"\n--- {r['input']} ---\n{r['erro']}", file=sys.stderr)
+    return 1 if falhas else 0
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    sys.exit(main())
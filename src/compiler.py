@@ -0,0 +1,194 @@
+from src.instrumentation import ativo
+from src.cache import CACHE_DIR_PADRAO
+
+import contextlib
+import subprocess
+import tempfile
+import hashlib
+import shutil
+import timeit
+import os
+
+
+
+#==============================================================================================================
+# FAST COMPILE DRIVER FOR pdfLaTeX
+# - O preâmbulo fixo do BeamerBuilder é "dumpado" uma vez em um formato (.fmt) em cache
+# - Roda só as passadas necessárias: para quando .aux/.nav/.toc/.snm/.out param de mudar
+# - Compila em um diretório temporário (tmpfs em /dev/shm, se existir), limpo em processo
+class LatexCompiler:
+    # Arquivos que, se mudarem entre passadas, exigem outra passada
+    EXTENSOES_CONTROLE = ("aux", "nav", "toc", "snm", "out")
+    EXTENSOES_AUXILIARES = ("aux", "log", "nav", "out", "snm", "toc", "vrb")
+
+    _versao_pdflatex = {}
+
+    def __init__(self, preambulo_fixo=None, cache_dir=None, max_passes=3, usar_formato=True,
+                 usar_tmpfs=True, pdflatex="pdflatex", timeout=None):
+        self.preambulo_fixo = preambulo_fixo
+        self.cache_dir = cache_dir or CACHE_DIR_PADRAO
+        self.max_passes = max_passes
+        self.usar_formato = usar_formato and preambulo_fixo is not None
+        self.usar_tmpfs = usar_tmpfs
+        self.pdflatex = pdflatex
+        self.timeout = timeout
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Formato pré-compilado
+    def _versao(self):
+        versao = self._versao_pdflatex.get(self.pdflatex)
+        if versao is None:
+            saida = subprocess.run([self.pdflatex, "--version"], capture_output=True, text=True)
+            versao = self._versao_pdflatex[self.pdflatex] = saida.stdout.split('\n', 1)[0]
+        return versao
+
+    def _nome_formato(self):
+        h = hashlib.sha256((self._versao() + '\0' + self.preambulo_fixo).encode('utf-8'))
+        return "beamifier-" + h.hexdigest()[:16]
+
+    def obter_formato(self):
+        """
+        Retorna (caminho do .fmt do preâmbulo fixo, tempo gasto), gerando o formato na primeira vez.
+        O caminho é None se o formato não puder ser gerado (a compilação segue sem ele).
+        """
+        nome = self._nome_formato()
+        diretorio = os.path.join(self.cache_dir, "fmt")
+        caminho = os.path.join(diretorio, nome + ".fmt")
+        if os.path.exists(caminho):
+            return caminho, 0.0
+
+        os.makedirs(diretorio, exist_ok=True)
+        start = timeit.default_timer()
+        with tempfile.TemporaryDirectory(dir=diretorio) as build_dir:
+            with open(os.path.join(build_dir, nome + ".tex"), "w", encoding="utf-8") as f:
+                f.write(self.preambulo_fixo)
+                f.write("\n\\dump\n")
+            subprocess.run(
+                [self.pdflatex, "-ini", "-interaction=batchmode", f"-jobname={nome}", "&pdflatex", nome + ".tex"],
+                cwd=build_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout
+            )
+            gerado = os.path.join(build_dir, nome + ".fmt")
+            if not os.path.exists(gerado):
+                return None, timeit.default_timer() - start
+            # os.replace é atômico: vários processos podem gerar o mesmo formato ao mesmo tempo
+            os.replace(gerado, caminho)
+        tempo = timeit.default_timer() - start
+        ativo().registrar_span("pdflatex_formato", start, tempo, formato=nome)
+        return caminho, tempo
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Compilação
+    def _diretorio_temporario(self):
+        if self.usar_tmpfs and os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+            return tempfile.mkdtemp(prefix="beamifier-", dir="/dev/shm")
+        return tempfile.mkdtemp(prefix="beamifier-")
+
+    def _estado_controle(self, build_dir, nome):
+        estado = {}
+        for extensao in self.EXTENSOES_CONTROLE:
+            caminho = os.path.join(build_dir, f"{nome}.{extensao}")
+            if os.path.exists(caminho):
+                with open(caminho, "rb") as f:
+                    estado[extensao] = hashlib.sha1(f.read()).digest()
+        return estado
+
+    def _dir_aux_cache(self, tex_path):
+        chave = hashlib.sha1(os.path.abspath(tex_path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, "aux", chave)
+
+    def _copiar_auxiliares(self, origem, destino, nome, extensoes):
+        os.makedirs(destino, exist_ok=True)
+        for extensao in extensoes:
+            caminho = os.path.join(origem, f"{nome}.{extensao}")
+            if os.path.exists(caminho):
+                shutil.copyfile(caminho, os.path.join(destino, f"{nome}.{extensao}"))
+
+    def _compilar_em(self, build_dir, conteudo, arquivo, nome, formato, env, aux_cache, resultado):
+        # Passadas do pdflatex em build_dir até os arquivos de controle estabilizarem; True se gerou o PDF
+        with open(os.path.join(build_dir, arquivo), "w", encoding="utf-8") as f:
+            f.write(conteudo)
+        # Reaproveita .aux/.nav do último build deste arquivo: edições pequenas fecham em uma passada
+        if os.path.isdir(aux_cache):
+            self._copiar_auxiliares(aux_cache, build_dir, nome, self.EXTENSOES_CONTROLE)
+
+        command = [self.pdflatex, "-interaction=batchmode"]
+        if formato is not None:
+            shutil.copyfile(formato, os.path.join(build_dir, "beamifier.fmt"))
+            command.append("-fmt=beamifier")
+        command.append(arquivo)
+
+        anterior = self._estado_controle(build_dir, nome)
+        for n in range(1, self.max_passes + 1):
+            start = timeit.default_timer()
+            processo = subprocess.run(command, cwd=build_dir, env=env, stdout=subprocess.DEVNULL,
+                                      stderr=subprocess.DEVNULL, timeout=self.timeout)
+            tempo = timeit.default_timer() - start
+            resultado["passes"].append({"pass": len(resultado["passes"]) + 1, "tempo": tempo,
+                                        "returncode": processo.returncode})
+            ativo().registrar_span("pdflatex_pass", start, tempo, passada=n, returncode=processo.returncode)
+            atual = self._estado_controle(build_dir, nome)
+            if atual == anterior:
+                break
+            anterior = atual
+        return os.path.exists(os.path.join(build_dir, nome + ".pdf"))
+
+    def compilar(self, tex_path, remove_trash=True):
+        """
+        Compila tex_path e coloca o PDF ao lado dele.
+        Retorna um dicionário com sucesso, caminho do pdf, uso do formato e o tempo de cada passada.
+        Se a compilação com o formato em cache falhar, o formato é apagado (pode ter sido gerado com
+        erros) e o documento é compilado de novo por inteiro, sem ele.
+        """
+        tex_path = os.path.abspath(tex_path)
+        saida_dir, arquivo = os.path.split(tex_path)
+        nome = os.path.splitext(arquivo)[0]
+        resultado = {"sucesso": False, "pdf": os.path.join(saida_dir, nome + ".pdf"),
+                     "formato": None, "tempo_formato": 0.0, "passes": []}
+
+        with open(tex_path, "r", encoding="utf-8") as f:
+            conteudo = f.read()
+
+        formato = None
+        if self.usar_formato and conteudo.startswith(self.preambulo_fixo):
+            formato, resultado["tempo_formato"] = self.obter_formato()
+
+        # Figuras com caminho relativo: procura no diretório atual (como antes) e no do .tex
+        env = os.environ.copy()
+        env["TEXINPUTS"] = os.pathsep.join([os.getcwd(), saida_dir, env.get("TEXINPUTS", "")])
+        aux_cache = self._dir_aux_cache(tex_path)
+
+        build_dir = self._diretorio_temporario()
+        try:
+            if formato is not None:
+                # O preâmbulo fixo já está no formato: compila só o restante
+                resultado["formato"] = formato
+                sucesso = self._compilar_em(build_dir, conteudo[len(self.preambulo_fixo):], arquivo, nome,
+                                            formato, env, aux_cache, resultado)
+                if not sucesso:
+                    with contextlib.suppress(OSError):
+                        os.remove(formato)
+                    ativo().contar("pdflatex_formato_descartado")
+                    resultado["formato"] = None
+                    shutil.rmtree(build_dir, ignore_errors=True)
+                    build_dir = self._diretorio_temporario()
+            if resultado["formato"] is None:
+                sucesso = self._compilar_em(build_dir, conteudo, arquivo, nome, None, env, aux_cache, resultado)
+
+            if sucesso:
+                shutil.move(os.path.join(build_dir, nome + ".pdf"), resultado["pdf"])
+                resultado["sucesso"] = True
+                self._copiar_auxiliares(build_dir, aux_cache, nome, self.EXTENSOES_CONTROLE)
+            if not remove_trash:
+                self._copiar_auxiliares(build_dir, saida_dir, nome, self.EXTENSOES_AUXILIARES)
+            elif not resultado["sucesso"]:
+                # Mantém o log para depuração quando a compilação falha
+                self._copiar_auxiliares(build_dir, saida_dir, nome, ("log",))
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        return resultado
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
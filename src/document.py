@@ -0,0 +1,188 @@
+from src.extractor import LatexIngestor
+from src.loader import ProjectLoader
+from src.instrumentation import ativo
+from src.cache import CACHE_DIR_PADRAO, escrever_atomico
+
+import hashlib
+import json
+import gzip
+import os
+
+
+
+# Muda quando o formato ou o resultado do parse (tokenizador/extrator) muda:
+# documentos de versões anteriores são ignorados e refeitos
+VERSAO_DOCUMENTO = 1
+
+
+
+def _estado_arquivos(caminhos):
+    # (caminho, mtime_ns, tamanho) de cada arquivo lido pelo loader
+    estado = []
+    for caminho in caminhos:
+        info = os.stat(caminho)
+        estado.append([caminho, info.st_mtime_ns, info.st_size])
+    return estado
+
+def _inalterados(arquivos):
+    try:
+        return all(_estado_arquivos([caminho])[0] == [caminho, mtime, tamanho] for caminho, mtime, tamanho in arquivos)
+    except OSError:
+        return False
+
+def _com_hash(pedacos, h):
+    for pedaco in pedacos:
+        h.update(pedaco.encode('utf-8'))
+        yield pedaco
+
+def _novo_hash():
+    return hashlib.sha256(f"beamifier-documento\0{VERSAO_DOCUMENTO}\0".encode('utf-8'))
+
+def fonte_com_hash(caminho, loader=None):
+    """
+    Pedaços do fonte expandido (como ProjectLoader.iterar) e uma função que, depois que todos
+    forem consumidos, retorna o mesmo que hash_fonte: o parse em fluxo calcula o hash na mesma leitura.
+    """
+    loader = loader or ProjectLoader()
+    h, arquivos = _novo_hash(), []
+    return _com_hash(loader.iterar(caminho, arquivos), h), lambda: (h.hexdigest(), _estado_arquivos(arquivos))
+
+def hash_fonte(caminho, loader=None):
+    """
+    Hash do fonte expandido (arquivo principal + \\input/\\include) e a lista de arquivos lidos.
+    Não tokeniza nada: só lê (com o cache do ProjectLoader) e resolve as inclusões.
+    """
+    pedacos, resultado = fonte_com_hash(caminho, loader)
+    for _ in pedacos:
+        pass
+    return resultado()
+
+
+
+#==============================================================================================================
+# PARSED DOCUMENT
+# Resultado do parse de um artigo (metadados e seções com seus assets), independente do modelo.
+# Pode ser salvo em disco (JSON compactado com gzip, com versão) e reaproveitado por vários
+# modelos e execuções: ver DocumentStore e Beamifier_Pipeline.run_from_document.
+class Document:
+    def __init__(self, origem, metadados, secoes, hash_fonte=None, arquivos=None):
+        self.origem = os.path.abspath(origem)  # arquivo principal (figuras são resolvidas a partir dele)
+        self.metadados = metadados              # {"titulo": ..., "autor": ...}
+        self.secoes = secoes                    # [{"titulo": ..., "conteudo": ..., "assets": [...]}]
+        self.hash_fonte = hash_fonte
+        self.arquivos = arquivos or []          # [[caminho, mtime_ns, tamanho]] dos arquivos lidos
+
+    @property
+    def base_dir(self):
+        return os.path.dirname(self.origem)
+
+    @classmethod
+    def analisar(cls, caminho):
+        """
+        Faz o parse completo de `caminho`, calculando o hash do fonte na mesma passada.
+        """
+        ingestor = LatexIngestor()
+        pedacos, resultado = fonte_com_hash(caminho, ingestor.loader)
+        analise = ingestor.tokenizer.tokenizar(pedacos)
+        return cls(caminho, ingestor.extrair_metadados(analise), ingestor.extrair_secoes(analise), *resultado())
+
+    def salvar(self, caminho):
+        dados = {
+            "versao": VERSAO_DOCUMENTO,
+            "hash_fonte": self.hash_fonte,
+            "metadados": self.metadados,
+            "secoes": self.secoes,
+        }
+        conteudo = json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        escrever_atomico(caminho, gzip.compress(conteudo, mtime=0))
+
+    @classmethod
+    def carregar(cls, caminho, origem):
+        """
+        Lê um documento salvo. Retorna None se ele não existir, for de outra versão ou estiver corrompido.
+        `origem` é o arquivo principal atual (o mesmo conteúdo pode estar em outro lugar).
+        """
+        try:
+            with gzip.open(caminho, 'rb') as f:
+                dados = json.loads(f.read().decode('utf-8'))
+        except (OSError, EOFError, ValueError):
+            return None
+        if not isinstance(dados, dict) or dados.get('versao') != VERSAO_DOCUMENTO:
+            return None
+        return cls(origem, dados['metadados'], dados['secoes'], dados['hash_fonte'])
+#==============================================================================================================
+
+
+
+#==============================================================================================================
+# DOCUMENT STORE
+# Documentos endereçados pelo hash do fonte (~/.cache/beamifier/documentos/<hash>.json.gz), mais um
+# índice por caminho com mtime/tamanho de cada arquivo lido: se nada mudou, o documento é aberto
+# sem ler o fonte; se algo mudou, o hash é recalculado (sem tokenizar) antes de decidir refazer o parse.
+class DocumentStore:
+    def __init__(self, cache_dir=None):
+        self.dir = os.path.join(cache_dir or CACHE_DIR_PADRAO, "documentos")
+
+    def _caminho_documento(self, hash_fonte):
+        return os.path.join(self.dir, hash_fonte + ".json.gz")
+
+    def _caminho_indice(self, origem):
+        return os.path.join(self.dir, "indice", hashlib.sha256(origem.encode('utf-8')).hexdigest()[:24] + ".json")
+
+    def _ler_indice(self, origem):
+        try:
+            with open(self._caminho_indice(origem), 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return indice if isinstance(indice, dict) and indice.get('versao') == VERSAO_DOCUMENTO else None
+
+    def _salvar_indice(self, documento):
+        indice = {"versao": VERSAO_DOCUMENTO, "origem": documento.origem, "hash_fonte": documento.hash_fonte,
+                  "arquivos": documento.arquivos}
+        escrever_atomico(self._caminho_indice(documento.origem), json.dumps(indice, ensure_ascii=False).encode('utf-8'))
+
+    def buscar(self, caminho):
+        """
+        Documento salvo para o conteúdo atual de `caminho`, ou None.
+        """
+        origem = os.path.abspath(caminho)
+        indice = self._ler_indice(origem)
+        if indice is not None and _inalterados(indice['arquivos']):
+            documento = Document.carregar(self._caminho_documento(indice['hash_fonte']), origem)
+            if documento is not None:
+                documento.arquivos = indice['arquivos']
+                ativo().contar("documentos_cache")
+                return documento
+        # Arquivos tocados, ou outro caminho: o conteúdo ainda pode ser conhecido
+        hash_atual, arquivos = hash_fonte(origem)
+        documento = Document.carregar(self._caminho_documento(hash_atual), origem)
+        if documento is None:
+            return None
+        documento.arquivos = arquivos
+        self._salvar_indice(documento)
+        ativo().contar("documentos_cache")
+        return documento
+
+    def guardar(self, documento):
+        if documento.hash_fonte is None:
+            documento.hash_fonte, documento.arquivos = hash_fonte(documento.origem)
+        documento.salvar(self._caminho_documento(documento.hash_fonte))
+        self._salvar_indice(documento)
+        return documento
+
+    def obter(self, caminho):
+        """
+        Documento de `caminho`: o salvo, se o fonte não mudou, ou um parse novo (que passa a ser salvo).
+        """
+        documento = self.buscar(caminho)
+        if documento is None:
+            with ativo().span("parse", documento=True):
+                documento = self.guardar(Document.analisar(caminho))
+        return documento
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
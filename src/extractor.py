@@ -1,144 +1,128 @@
-import os
+from src.latex_tokenizer import LatexTokenizer
+from src.loader import ProjectLoader
+
 import re
 
 
+# Limpeza de comandos de formatação em metadados (ver _limpar_comando_latex)
+_PADRAO_LIMPEZA = re.compile(r'\\IEEEauthorblock[NA]\{|\\textbf\{|\\textit\{|\\emph\{|\\and|\\|[{}]')
+
+def _substituir_limpeza(match):
+    trecho = match.group()
+    if trecho == '\\and':
+        return ', '
+    if trecho == '\\':
+        return ' '
+    return ''
+
+
+
 #==============================================================================================================
 # CUSTOM CLASSES FOR EXTRACTING USEFUL TEXT FROM .tex
-# Baseado em expressoes regulares
+# Baseado em um tokenizador de passada única (ver latex_tokenizer.py)
 class LatexIngestor:
     def __init__(self):
         self.secoes = []
+        self.tokenizer = LatexTokenizer()
+        self.loader = ProjectLoader()
+        self._ultima_fonte = None
+        self._ultima_analise = None
 
     def _ler_arquivo_seguro(self, caminho_arquivo):
-        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            return f.read()
+        return self.loader.ler(caminho_arquivo)
 
     def carregar_projeto_recursivo(self, caminho_arquivo):
-        def substituir_input(match):
-            nome_sub_arquivo = match.group(1)
-            if not nome_sub_arquivo.endswith('.tex'):
-                nome_sub_arquivo += '.tex'
-            caminho_completo = os.path.join(diretorio_base, nome_sub_arquivo)
-            return self.carregar_projeto_recursivo(caminho_completo)
-        
-        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            conteudo = f.read()
-        # Regex para inputs
-        pattern_input = r'\\(?:input|include)\{([^}]+)\}'
-        return re.sub(pattern_input, substituir_input, conteudo)
+        # Expande \input/\include (com cache por mtime e detecção de ciclos)
+        return self.loader.carregar(caminho_arquivo)
+
+    def analisar_projeto(self, caminho_arquivo):
+        """
+        Tokeniza o projeto consumindo diretamente os pedaços do loader, sem montar
+        o fonte expandido inteiro. O resultado pode ser passado a extrair_secoes
+        e extrair_metadados no lugar do texto.
+        """
+        return self.tokenizer.tokenizar(self.loader.iterar(caminho_arquivo))
+
+    def _analisar(self, latex_source):
+        # Tokeniza uma única vez; extrair_secoes e extrair_metadados reaproveitam o resultado
+        if isinstance(latex_source, dict):
+            return latex_source
+        if self._ultima_fonte is not latex_source and self._ultima_fonte != latex_source:
+            self._ultima_analise = self.tokenizer.tokenizar(latex_source)
+            self._ultima_fonte = latex_source
+        return self._ultima_analise
 
     def pre_processar_texto(self, latex_source):
-        # Remove comentários
-        clean_text = re.sub(r'(?<!\\)%.*', '', latex_source)
-        # Normaliza espaços
-        return re.sub(r'\s+', ' ', clean_text).strip()
+        # Remove comentários e normaliza espaços
+        return self._analisar(latex_source)['texto']
 
     def _limpar_comando_latex(self, texto):
         #Remove comandos comuns do LaTeX como \textbf{}, \IEEEauthorblockN{}, etc.
         #deixando apenas o texto interno.
         if not texto: return ""
-        
-        # 1. Substitui comandos conhecidos do IEEE e formatação simples
-        # Ex: \IEEEauthorblockN{Nome} -> Nome
-        texto = re.sub(r'\\IEEEauthorblock[NA]\{', '', texto)
-        texto = re.sub(r'\\textbf\{', '', texto)
-        texto = re.sub(r'\\textit\{', '', texto)
-        texto = re.sub(r'\\emph\{', '', texto)
-
-        # 2. Converte comandos de separação
-        texto = re.sub(r'\\and', ', ', texto)
-        texto = re.sub(r'\\', ' ', texto) # Remove quebras de linha manuais
-
-        # 3. Limpeza final de caracteres residuais (chaves que sobraram)
-        texto = texto.replace('{', '').replace('}', '')
-        
-        # 4. Normaliza espaços
-        return re.sub(r'\s+', ' ', texto).strip()
-
-    def _extrair_e_remover_assets(self, texto_secao):
-        """
-        Identifica ambientes de Figura e Tabela, extrai o código LaTeX bruto
-        e remove do texto principal (para não confundir a IA de resumo).
-        """
-        assets = []
-
-        # Regex para capturar Figuras (incluindo figure*)
-        # O .*? é non-greedy (pega o mínimo possível até o end)
-        pattern_fig = r'(\\begin\{figure\*?\}.*?\\end\{figure\*?\})'
-        figs = re.findall(pattern_fig, texto_secao, re.DOTALL)
-        assets.extend([{'tipo': 'figura', 'codigo': f} for f in figs])
-        
-        # Remove as figuras do texto
-        texto_limpo = re.sub(pattern_fig, '', texto_secao, flags=re.DOTALL)
-
-        # Regex para capturar Tabelas (incluindo table*)
-        pattern_tab = r'(\\begin\{table\*?\}.*?\\end\{table\*?\})'
-        tabs = re.findall(pattern_tab, texto_limpo, re.DOTALL)
-        assets.extend([{'tipo': 'tabela', 'codigo': t} for t in tabs])
-
-        # Remove as tabelas do texto
-        texto_limpo = re.sub(pattern_tab, '', texto_limpo, flags=re.DOTALL)
-
-        return texto_limpo, assets
+        # Uma única passada: aberturas de comandos de formatação somem, \and vira vírgula,
+        # demais barras (quebras de linha manuais) viram espaço e chaves residuais somem
+        texto = _PADRAO_LIMPEZA.sub(_substituir_limpeza, texto)
+        # Normaliza espaços
+        return ' '.join(texto.split())
 
     def extrair_metadados(self, latex_completo):
         """
         Busca \title{} e \author{} no texto completo com limpeza aprimorada.
         """
-        texto_limpo = self.pre_processar_texto(latex_completo)
+        analise = self._analisar(latex_completo)
         metadados = {
             "titulo": "Apresentação sem Título",
             "autor": "Autor Desconhecido"
         }
-
-        # Busca Título
-        match_title = re.search(r'\\title\{([^}]*)\}', texto_limpo, re.IGNORECASE | re.DOTALL)
-        if match_title:
-            metadados["titulo"] = self._limpar_comando_latex(match_title.group(1))
-
-        # Busca Autor
-        match_author = re.search(r'\\author\{([^}]*)\}', texto_limpo, re.IGNORECASE | re.DOTALL)
-        if match_author:
-            metadados["autor"] = self._limpar_comando_latex(match_author.group(1))
-
+        if analise['titulo'] is not None:
+            metadados["titulo"] = self._limpar_comando_latex(analise['titulo'])
+        if analise['autor'] is not None:
+            metadados["autor"] = self._limpar_comando_latex(analise['autor'])
         return metadados
 
-    def extrair_secoes(self, latex_completo):
-        texto_limpo = self.pre_processar_texto(latex_completo)
-        
-        match = re.search(r'\\begin\{document\}(.*?)\\end\{document\}', texto_limpo, re.DOTALL)
-        if not match: return []
-        corpo = match.group(1)
-        
-        partes = re.split(r'\\section\{([^}]*)\}', corpo)
-        resultado = []
-        
+    def _secao(self, parte, primeira):
         # TODO: deixamos assim?
         # Processa contexto (abstract/intro)
-        if len(partes[0].strip()) > 50:
-            texto_conteudo, assets = self._extrair_e_remover_assets(partes[0].strip())
-            resultado.append({
-                "titulo": "Contexto", 
-                "conteudo": texto_conteudo,
-                "assets": assets
-            })
+        if primeira:
+            if parte['tamanho'] > 50:
+                return {
+                    "titulo": "Contexto",
+                    "conteudo": parte['conteudo'],
+                    "assets": parte['assets']
+                }
+            return None
 
         # Processa seções numeradas
-        for i in range(1, len(partes), 2):
-            titulo = partes[i].strip()
-            raw_conteudo = partes[i+1].strip()
-            
-            # Separa o texto narrativo dos objetos visuais
-            texto_conteudo, assets = self._extrair_e_remover_assets(raw_conteudo)
-            
-            if "biblio" not in titulo.lower() and "reference" not in titulo.lower():
-                resultado.append({
-                    "titulo": titulo, 
-                    "conteudo": texto_conteudo,
-                    "assets": assets # Nova chave contendo a lista de tabelas/imagens
-                })
-                
-        return resultado
+        titulo = parte['titulo']
+        if "biblio" not in titulo.lower() and "reference" not in titulo.lower():
+            return {
+                "titulo": titulo,
+                "conteudo": parte['conteudo'],
+                "assets": parte['assets'] # Lista de tabelas/imagens
+            }
+        return None
+
+    def extrair_secoes(self, latex_completo):
+        partes = self._analisar(latex_completo)['partes']
+        if not partes: return []
+        secoes = (self._secao(parte, i == 0) for i, parte in enumerate(partes))
+        return [secao for secao in secoes if secao is not None]
+
+    def iterar_secoes(self, caminho_arquivo, estado=None, pedacos=None):
+        """
+        Versão em fluxo de analisar_projeto + extrair_secoes: cada seção é produzida assim que
+        termina de ser lida. `estado` recebe titulo/autor brutos assim que aparecem (pode ser
+        passado a extrair_metadados) e completo=True quando o \\end{document} é encontrado.
+        `pedacos` substitui a leitura de caminho_arquivo (ex.: fonte_com_hash, que calcula o hash junto).
+        """
+        if pedacos is None:
+            pedacos = self.loader.iterar(caminho_arquivo)
+        partes = self.tokenizer.iterar_partes(pedacos, estado)
+        for i, parte in enumerate(partes):
+            secao = self._secao(parte, i == 0)
+            if secao is not None:
+                yield secao
 #==============================================================================================================
 
 
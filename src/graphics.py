@@ -0,0 +1,224 @@
+from src.instrumentation import ativo
+from src.cache import CACHE_DIR_PADRAO, escrever_atomico
+
+from concurrent.futures import ThreadPoolExecutor
+
+import importlib.util
+import contextlib
+import threading
+import logging
+import hashlib
+import os
+import io
+import re
+
+
+
+logger = logging.getLogger(__name__)
+
+_PADRAO_INCLUDEGRAPHICS = re.compile(r'(\\includegraphics\s*(?:\[[^\]]*\])?\s*\{)([^}]+)(\})')
+
+# Extensões tentadas, na ordem do pdflatex, quando \includegraphics não dá a extensão
+EXTENSOES_GRAFICOS = ('.pdf', '.png', '.jpg', '.jpeg')
+
+
+
+#==============================================================================================================
+# GRAPHICS PREPROCESSING FOR FIGURE ASSETS
+# Reduz as imagens das figuras para a resolução de um slide antes da compilação:
+# - caminhos de \includegraphics são resolvidos em relação ao diretório do artigo
+# - PNG/JPEG maiores que o slide na resolução alvo são reduzidos e recomprimidos em um
+#   diretório de cache endereçado pelo conteúdo (~/.cache/beamifier/graficos)
+# - o código da figura passa a apontar para a imagem em cache (caminho absoluto); imagens que não
+#   foram reduzidas mantêm o caminho original, e o .tex continua portável
+# - as imagens são processadas em paralelo, assim que cada seção é lida (o pool de threads é
+#   criado sob demanda e encerrado por fechar() no fim de cada run)
+# - o cache tem tamanho máximo: passando de max_bytes, saem as imagens usadas há mais tempo
+#   (mtime, renovado a cada acerto), nunca as que o run atual referencia
+# Pillow é opcional: sem ele, nada é reduzido e o .tex fica como estaria sem este estágio.
+class Graphics_Preprocessor:
+    # Área útil de um slide Beamer 4:3 (128mm x 96mm), em polegadas
+    LARGURA_SLIDE = 5.04
+    ALTURA_SLIDE = 3.78
+    VERSAO = 1 # Muda a chave do cache quando o processamento muda
+
+    _aviso_pillow = False
+
+    def __init__(self, cache_dir=None, dpi=150, qualidade_jpeg=85, workers=None, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = os.path.join(cache_dir or CACHE_DIR_PADRAO, "graficos")
+        self.dpi = dpi
+        self.qualidade_jpeg = qualidade_jpeg
+        self.max_bytes = max_bytes
+        self.max_pixels = (round(self.LARGURA_SLIDE * dpi), round(self.ALTURA_SLIDE * dpi))
+        self.pillow = importlib.util.find_spec("PIL") is not None
+        if not self.pillow and not Graphics_Preprocessor._aviso_pillow:
+            Graphics_Preprocessor._aviso_pillow = True
+            logger.warning("Pillow não instalado: as imagens das figuras não serão reduzidas (pip install Pillow)")
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self._pool = None
+        self._usados = set()  # imagens do cache referenciadas pelo run atual (não podem ser removidas)
+        self._futuros = {} # (caminho absoluto, mtime, tamanho) da imagem original -> Future do caminho final
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Resolução de caminhos
+    def _resolver(self, caminho, base_dir):
+        candidatos = [caminho] if os.path.isabs(caminho) else [os.path.join(base_dir, caminho), caminho]
+        for candidato in candidatos:
+            if os.path.splitext(candidato)[1].lower() in EXTENSOES_GRAFICOS and os.path.isfile(candidato):
+                return os.path.abspath(candidato)
+            for extensao in EXTENSOES_GRAFICOS:
+                if os.path.isfile(candidato + extensao):
+                    return os.path.abspath(candidato + extensao)
+        return None
+
+    def _caminhos(self, codigo, base_dir):
+        for m in _PADRAO_INCLUDEGRAPHICS.finditer(codigo):
+            yield self._resolver(m.group(2).strip(), base_dir)
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Processamento
+    def _chave(self, conteudo, extensao):
+        h = hashlib.sha256(conteudo)
+        h.update(f"\0{self.VERSAO}\0{self.dpi}\0{self.qualidade_jpeg}".encode('utf-8'))
+        return h.hexdigest()[:24] + extensao
+
+    def _processar(self, caminho):
+        """
+        Retorna o caminho que o .tex deve usar para a imagem: a versão reduzida em cache,
+        ou o próprio original (absoluto) quando não há o que reduzir.
+        """
+        extensao = os.path.splitext(caminho)[1].lower()
+        if not self.pillow or extensao not in ('.png', '.jpg', '.jpeg'):
+            return caminho
+        with open(caminho, "rb") as f:
+            conteudo = f.read()
+        destino = os.path.join(self.cache_dir, self._chave(conteudo, extensao))
+        with self._lock:
+            self._usados.add(destino)
+        if os.path.exists(destino):
+            with contextlib.suppress(OSError):
+                os.utime(destino) # LRU do cache
+            ativo().contar("graficos_cache")
+            return destino
+
+        from PIL import Image
+        with ativo().span("reduzir_grafico", arquivo=os.path.basename(caminho)), Image.open(caminho) as imagem:
+            if imagem.width <= self.max_pixels[0] and imagem.height <= self.max_pixels[1]:
+                return caminho
+            imagem.load()
+            # thumbnail mantém a proporção e nunca aumenta a imagem
+            imagem.thumbnail(self.max_pixels, Image.LANCZOS)
+            saida = io.BytesIO()
+            if extensao == '.png':
+                imagem.save(saida, "PNG", optimize=True, dpi=(self.dpi, self.dpi))
+            else:
+                if imagem.mode not in ("RGB", "L", "CMYK"):
+                    imagem = imagem.convert("RGB")
+                imagem.save(saida, "JPEG", quality=self.qualidade_jpeg, optimize=True,
+                            progressive=True, dpi=(self.dpi, self.dpi))
+            # Só troca se ficou menor (PNG já bem comprimido pode crescer)
+            if saida.tell() >= len(conteudo):
+                return caminho
+            # Atômico: vários processos podem gerar a mesma imagem ao mesmo tempo
+            escrever_atomico(destino, saida.getvalue())
+            ativo().contar("graficos_reduzidos")
+        self._limitar()
+        return destino
+
+    def _limitar(self):
+        # Remove as imagens usadas há mais tempo até o cache voltar a max_bytes
+        # (outros processos podem estar fazendo o mesmo: arquivos já removidos são ignorados)
+        if self.max_bytes is None or not os.path.isdir(self.cache_dir):
+            return
+        with self._lock:
+            usados = set(self._usados)
+        arquivos, total = [], 0
+        with os.scandir(self.cache_dir) as entradas:
+            for entrada in entradas:
+                if not entrada.is_file() or entrada.name.endswith(".tmp"):
+                    continue
+                with contextlib.suppress(OSError):
+                    info = entrada.stat()
+                    arquivos.append((info.st_mtime, info.st_size, entrada.path))
+                    total += info.st_size
+        if total <= self.max_bytes:
+            return
+        for _, tamanho, caminho in sorted(arquivos):
+            if caminho in usados:
+                continue
+            with contextlib.suppress(OSError):
+                os.remove(caminho)
+                ativo().contar("graficos_despejados")
+            total -= tamanho
+            if total <= self.max_bytes:
+                break
+
+    def _processar_seguro(self, caminho):
+        try:
+            return self._processar(caminho)
+        except Exception as exc:
+            logger.warning(f"Não foi possível reduzir {caminho}: {exc}")
+            return caminho
+
+    def _futuro(self, caminho):
+        # A mesma imagem (e versão do arquivo) é processada uma única vez por instância
+        info = os.stat(caminho)
+        chave = (caminho, info.st_mtime_ns, info.st_size)
+        with self._lock:
+            futuro = self._futuros.get(chave)
+            if futuro is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers)
+                futuro = self._futuros[chave] = self._pool.submit(self._processar_seguro, caminho)
+        return futuro
+
+    def iniciar(self, assets, base_dir):
+        """
+        Começa a processar, em segundo plano, as imagens das figuras de `assets`.
+        """
+        for asset in assets:
+            if asset['tipo'] != 'figura':
+                continue
+            for caminho in self._caminhos(asset['codigo'], base_dir):
+                if caminho is not None:
+                    self._futuro(caminho)
+
+    def reescrever(self, codigo, base_dir):
+        """
+        Código da figura com cada \\includegraphics apontando para a imagem reduzida.
+        Imagens não encontradas ou não reduzidas ficam como estão.
+        """
+        def substituir(m):
+            caminho = self._resolver(m.group(2).strip(), base_dir)
+            if caminho is None:
+                return m.group(0)
+            processado = self._futuro(caminho).result()
+            if processado == caminho:
+                return m.group(0)
+            # Barras normais: o pdflatex não aceita '\' em caminhos
+            return m.group(1) + processado.replace(os.sep, '/') + m.group(3)
+        return _PADRAO_INCLUDEGRAPHICS.sub(substituir, codigo)
+
+    def reescrever_assets(self, assets, base_dir):
+        return [
+            dict(asset, codigo=self.reescrever(asset['codigo'], base_dir)) if asset['tipo'] == 'figura' else asset
+            for asset in assets
+        ]
+
+    def fechar(self):
+        # Fim do run: encerra as threads (um próximo run cria outro pool) e aplica o limite do cache
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+        self._limitar()
+        with self._lock:
+            self._futuros.clear()
+            self._usados.clear()
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
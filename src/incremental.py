@@ -0,0 +1,103 @@
+from src.cache import escrever_atomico
+
+import hashlib
+import json
+import os
+
+
+
+VERSAO_MANIFESTO = 1
+
+
+
+def _hash(*partes):
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(parte.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+def hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def identidade_modelo(summarizer):
+    # Mesmo critério do cache de resumos: nome do modelo + template de prompt
+    return _hash(summarizer.model_name, getattr(summarizer, 'prompt_template', None) or "")
+
+def fingerprint_secao(section):
+    return _hash(section['titulo'], section['conteudo'])
+
+def fingerprint_assets(section):
+    return _hash(*(asset['tipo'] + '\0' + asset['codigo'] for asset in section.get('assets', [])))
+
+
+
+#==============================================================================================================
+# BUILD MANIFEST FOR INCREMENTAL REBUILDS
+# Guardado ao lado do .tex gerado (<saida>.beamifier.json)
+class BuildManifest:
+    def __init__(self, path, dados=None):
+        self.path = path
+        if dados is None or dados.get('versao') != VERSAO_MANIFESTO:
+            dados = {'versao': VERSAO_MANIFESTO, 'modelo': None, 'secoes': [], 'tex': None, 'tex_compilado': None}
+        self.dados = dados
+        self._topicos = {s['fingerprint']: s['topicos'] for s in dados['secoes']}
+
+    @staticmethod
+    def caminho_para(output_path):
+        return os.path.splitext(output_path)[0] + ".beamifier.json"
+
+    @classmethod
+    def carregar(cls, output_path):
+        path = cls.caminho_para(output_path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            dados = None
+        return cls(path, dados)
+
+    def topicos_reaproveitaveis(self, section, identidade):
+        """
+        Retorna os bullet points do último build para a seção se nem ela nem o modelo mudaram.
+        """
+        if self.dados['modelo'] != identidade:
+            return None
+        return self._topicos.get(fingerprint_secao(section))
+
+    def registrar_secoes(self, sections, topicos, identidade):
+        self.dados['modelo'] = identidade
+        self.dados['secoes'] = [
+            {
+                'titulo': section['titulo'],
+                'fingerprint': fingerprint_secao(section),
+                'assets': fingerprint_assets(section),
+                'topicos': t,
+            }
+            for section, t in zip(sections, topicos)
+        ]
+        self._topicos = {s['fingerprint']: s['topicos'] for s in self.dados['secoes']}
+
+    def registrar_tex(self, tex_path):
+        self.dados['tex'] = hash_arquivo(tex_path)
+        return self.dados['tex']
+
+    def precisa_compilar(self, tex_hash, pdf_path):
+        # Só recompila se o .tex mudou desde a última compilação bem-sucedida (ou se o PDF sumiu)
+        return self.dados['tex_compilado'] != tex_hash or not os.path.exists(pdf_path)
+
+    def registrar_compilacao(self, tex_hash):
+        self.dados['tex_compilado'] = tex_hash
+
+    def salvar(self):
+        escrever_atomico(self.path, json.dumps(self.dados, ensure_ascii=False, indent=1).encode('utf-8'))
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
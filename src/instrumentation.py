@@ -0,0 +1,205 @@
+import contextlib
+import threading
+import json
+import time
+import sys
+import os
+
+try:
+    import resource # Unix only
+except ImportError:
+    resource = None
+
+
+
+#==============================================================================================================
+# PIPELINE INSTRUMENTATION
+# Spans (nome, início, duração, atributos) e contadores registrados pelos componentes do Beamifier.
+# Os componentes usam sempre o tracer ativo (ativo()); fora de um `with ativar(tracer)` ele é um
+# tracer nulo que não registra nada. Hooks recebem cada evento na hora: hook(tipo, dados), com
+# tipo "span" ou "contador".
+# O tracer ativo é global no processo (as threads dos workers e do Request_Scheduler precisam
+# enxergá-lo): é um run instrumentado por vez por processo. Runs simultâneos em threads do mesmo
+# processo misturam eventos; cada um, ao terminar, sai da pilha sem restaurar o tracer do outro.
+def pico_rss():
+    """
+    Pico de memória residente do processo desde que ele começou, em bytes (None se indisponível).
+    Para o pico de um run, ver Tracer.resumo()['pico_rss_bytes'].
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KiB, macOS em bytes
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+def percentil(ordenados, p):
+    """
+    Percentil p (0-100) de uma lista já ordenada e não vazia, pelo método nearest-rank.
+    """
+    k = -(-p * len(ordenados) // 100) - 1
+    return ordenados[max(0, min(len(ordenados) - 1, int(k)))]
+
+
+def rss_atual():
+    """
+    Memória residente atual do processo, em bytes (None se indisponível; só Linux).
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            residentes = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return residentes * os.sysconf("SC_PAGE_SIZE")
+
+
+class Tracer:
+    habilitado = True
+
+    def __init__(self, hooks=None):
+        self.hooks = list(hooks or [])
+        self.spans = []
+        self.contadores = {}
+        self._origem = time.perf_counter()
+        self._lock = threading.Lock()
+        # RSS amostrado no fim de cada span: pico deste tracer, não do processo inteiro
+        self._pico_rss = rss_atual()
+
+    def adicionar_hook(self, hook):
+        self.hooks.append(hook)
+
+    def _notificar(self, tipo, dados):
+        for hook in self.hooks:
+            hook(tipo, dados)
+
+    @contextlib.contextmanager
+    def span(self, nome, **atributos):
+        """
+        Mede o bloco. O dicionário de atributos é devolvido para ser completado dentro do bloco.
+        """
+        inicio = time.perf_counter()
+        try:
+            yield atributos
+        finally:
+            self.registrar_span(nome, inicio, time.perf_counter() - inicio, **atributos)
+
+    def registrar_span(self, nome, inicio, duracao, **atributos):
+        # inicio: instante de time.perf_counter() (= timeit.default_timer())
+        span = {
+            "nome": nome,
+            "inicio": inicio - self._origem,
+            "duracao": duracao,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "atributos": atributos,
+        }
+        rss = rss_atual()
+        with self._lock:
+            self.spans.append(span)
+            if rss is not None and (self._pico_rss is None or rss > self._pico_rss):
+                self._pico_rss = rss
+        self._notificar("span", span)
+
+    def contar(self, nome, valor=1):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + valor
+        self._notificar("contador", {"nome": nome, "valor": valor})
+
+    def resumo(self):
+        """
+        Tempo total/máximo, percentis (p50/p95/p99) e número de chamadas por nome de span,
+        contadores, pico de RSS durante o trace (amostrado no fim de cada span; só Linux) e pico
+        de RSS do processo desde o início (pico_rss_processo_bytes).
+        """
+        estagios = {}
+        duracoes = {}
+        with self._lock:
+            spans = list(self.spans)
+            contadores = dict(self.contadores)
+            pico = self._pico_rss
+        for span in spans:
+            estagio = estagios.setdefault(span["nome"], {"chamadas": 0, "total_s": 0.0, "max_s": 0.0})
+            estagio["chamadas"] += 1
+            estagio["total_s"] += span["duracao"]
+            estagio["max_s"] = max(estagio["max_s"], span["duracao"])
+            duracoes.setdefault(span["nome"], []).append(span["duracao"])
+        for nome, valores in duracoes.items():
+            valores.sort()
+            for p in (50, 95, 99):
+                estagios[nome][f"p{p}_s"] = percentil(valores, p)
+        return {"estagios": estagios, "contadores": contadores, "pico_rss_bytes": pico,
+                "pico_rss_processo_bytes": pico_rss()}
+
+    def exportar_json(self, caminho):
+        dados = self.resumo()
+        with self._lock:
+            dados["spans"] = list(self.spans)
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, indent=1, default=str)
+
+    def exportar_chrome(self, caminho):
+        """
+        Formato Trace Event (chrome://tracing, Perfetto): um evento completo ("X") por span.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        eventos = [{
+            "name": span["nome"],
+            "ph": "X",
+            "ts": span["inicio"] * 1e6,
+            "dur": span["duracao"] * 1e6,
+            "pid": span["pid"],
+            "tid": span["tid"],
+            "args": span["atributos"],
+        } for span in spans]
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms", "otherData": self.resumo()},
+                      f, ensure_ascii=False, default=str)
+
+
+class _Tracer_Nulo:
+    habilitado = False
+
+    @contextlib.contextmanager
+    def span(self, nome, **atributos):
+        yield atributos
+
+    def registrar_span(self, nome, inicio, duracao, **atributos):
+        pass
+
+    def contar(self, nome, valor=1):
+        pass
+
+
+_NULO = _Tracer_Nulo()
+_ativo = _NULO
+_pilha = []     # tracers ativados, na ordem; o ativo é o último
+_lock_pilha = threading.Lock()
+
+def ativo():
+    return _ativo
+
+@contextlib.contextmanager
+def ativar(tracer):
+    # Global (não por thread): as threads do Request_Scheduler também enxergam o tracer
+    global _ativo
+    entrada = [tracer] # identidade da ativação (o mesmo tracer pode ser ativado mais de uma vez)
+    with _lock_pilha:
+        _pilha.append(entrada)
+        _ativo = tracer
+    try:
+        yield tracer
+    finally:
+        with _lock_pilha:
+            # Remove esta ativação, não necessariamente a última
+            for i in range(len(_pilha) - 1, -1, -1):
+                if _pilha[i] is entrada:
+                    del _pilha[i]
+                    break
+            _ativo = _pilha[-1][0] if _pilha else _NULO
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
@@ -0,0 +1,237 @@
+import re
+
+
+
+#==============================================================================================================
+# SINGLE-PASS LaTeX TOKENIZER
+# Percorre o fonte uma única vez e produz, ao mesmo tempo:
+#   - o texto sem comentários e com espaços normalizados
+#   - os argumentos de \title{} e \author{} (com chaves aninhadas)
+#   - as partes do corpo do documento, separadas por \section{}
+#   - os ambientes figure/table de cada parte (removidos do texto)
+_TOKEN = re.compile(r"""
+      (?P<comentario>%[^\n]*)
+    | (?P<comando>\\(?:[A-Za-z@]+\*?|.))
+    | (?P<abre>\{)
+    | (?P<fecha>\})
+    | (?P<texto>[^\\%{}]+)
+""", re.VERBOSE | re.DOTALL)
+
+# Comandos cujo primeiro argumento {…} interessa ao tokenizer
+_COMANDOS_ARGUMENTO = {
+    '\\title': 'titulo',
+    '\\author': 'autor',
+    '\\section': 'secao',
+    '\\section*': 'secao',
+    '\\begin': 'begin',
+    '\\end': 'end',
+}
+
+_AMBIENTES_ASSET = {
+    'figure': 'figura',
+    'figure*': 'figura',
+    'table': 'tabela',
+    'table*': 'tabela',
+}
+
+
+class LatexTokenizer:
+    def _tokens(self, fonte):
+        # fonte: string ou iterável de pedaços (ex.: ProjectLoader.iterar)
+        if isinstance(fonte, str):
+            for m in _TOKEN.finditer(fonte):
+                yield m.lastgroup, m.group()
+            return
+        resto = ''
+        for pedaco in fonte:
+            buffer = resto + pedaco
+            ultimo = None
+            for m in _TOKEN.finditer(buffer):
+                if ultimo is not None:
+                    yield ultimo.lastgroup, ultimo.group()
+                ultimo = m
+            # O último token pode continuar no próximo pedaço: fica para depois
+            resto = buffer[ultimo.start():] if ultimo is not None else buffer
+        for m in _TOKEN.finditer(resto):
+            yield m.lastgroup, m.group()
+
+    def tokenizar(self, latex_source):
+        """
+        Aceita o fonte como string ou como iterável de pedaços de string.
+        Retorna um dicionário com:
+            texto:  fonte sem comentários e com espaços normalizados
+            titulo, autor: conteúdo bruto do primeiro \\title{} / \\author{} (ou None)
+            partes: None se não houver \\begin{document}...\\end{document}; senão uma lista
+                    de dicionários (titulo, conteudo, assets, tamanho), em que a primeira parte
+                    (texto antes da primeira seção) tem titulo None e tamanho é o comprimento
+                    da parte antes da remoção dos assets
+        """
+        estado = {}
+        partes = list(self.iterar_partes(latex_source, estado))
+        return {
+            'texto': estado['texto'],
+            'titulo': estado['titulo'],
+            'autor': estado['autor'],
+            'partes': partes if estado['completo'] else None,
+        }
+
+    def iterar_partes(self, latex_source, estado=None):
+        """
+        Gerador das partes do corpo (mesmos dicionários de tokenizar()['partes']), cada uma
+        produzida assim que a \\section{} seguinte (ou o \\end{document}) é lida.
+        `estado`, se dado, recebe titulo/autor assim que aparecem e, ao fim, texto e completo
+        (False quando falta \\begin{document} ou \\end{document}: tokenizar descarta as partes).
+        """
+        if estado is None:
+            estado = {}
+        estado.update(titulo=None, autor=None, texto=None, completo=False)
+
+        out = []            # pedaços do texto normalizado
+        pos = 0             # tamanho atual do texto normalizado
+        espaco_pendente = False
+
+        # chaves abertas: (tipo, inicio_comando, inicio_argumento, indice_pedaco, indice_pedaco_comando)
+        pilha = []
+        esperando = None    # (tipo, inicio_comando, indice_pedaco_comando) de um comando aguardando seu '{'
+
+        corpo_ini = corpo_fim = None
+        assets = []         # (inicio, fim, tipo)
+        asset_atual = None  # [ambiente_base, inicio, profundidade, tipo]
+        i_asset = 0
+        # Parte em aberto: título, início no texto normalizado e índice do pedaço correspondente
+        titulo_secao = None
+        ini_parte = indice_parte = None
+
+        for grupo, bruto in self._tokens(latex_source):
+            valor = bruto
+
+            if grupo == 'comentario':
+                continue
+            if grupo == 'texto':
+                # Trechos de texto (com espaços) são normalizados de uma vez
+                palavras = valor.split()
+                if not palavras:
+                    if out:
+                        espaco_pendente = True
+                    continue
+                if valor[0].isspace() and out:
+                    espaco_pendente = True
+                valor = ' '.join(palavras)
+
+            if espaco_pendente:
+                out.append(' ')
+                pos += 1
+                espaco_pendente = False
+            inicio = pos
+
+            if grupo == 'comando' and valor[1:].isspace():
+                # Control space (ex.: "\ " ou "\<quebra de linha>"): o espaço entra na normalização
+                out.append('\\')
+                pos += 1
+                espaco_pendente = True
+                esperando = None
+                continue
+            out.append(valor)
+            pos += len(valor)
+
+            if grupo == 'abre':
+                if esperando is not None:
+                    pilha.append((esperando[0], esperando[1], pos, len(out), esperando[2]))
+                    esperando = None
+                else:
+                    pilha.append((None, inicio, pos, len(out), None))
+                continue
+
+            if grupo == 'fecha':
+                esperando = None
+                if not pilha:
+                    continue
+                tipo, inicio_comando, inicio_argumento, indice, indice_comando = pilha.pop()
+                if tipo is None:
+                    continue
+                if tipo in ('titulo', 'autor'):
+                    if estado[tipo] is None:
+                        estado[tipo] = ''.join(out[indice:-1])
+                elif tipo == 'secao':
+                    if corpo_ini is not None and corpo_fim is None and asset_atual is None:
+                        # A parte anterior termina no comando desta seção
+                        parte, i_asset = self._montar_parte(''.join(out[indice_parte:indice_comando]), ini_parte,
+                                                            inicio_comando, assets, i_asset, ini_parte)
+                        parte['titulo'] = titulo_secao
+                        yield parte
+                        titulo_secao = ''.join(out[indice:-1]).strip()
+                        ini_parte, indice_parte = pos, len(out)
+                else:
+                    ambiente = ''.join(out[indice:-1]).strip()
+                    if tipo == 'begin':
+                        if ambiente == 'document':
+                            if corpo_ini is None:
+                                corpo_ini = ini_parte = pos
+                                indice_parte = len(out)
+                        elif ambiente in _AMBIENTES_ASSET and corpo_ini is not None and corpo_fim is None:
+                            base = ambiente.rstrip('*')
+                            if asset_atual is None:
+                                asset_atual = [base, inicio_comando, 1, _AMBIENTES_ASSET[ambiente]]
+                            elif asset_atual[0] == base:
+                                asset_atual[2] += 1
+                    else:
+                        if ambiente == 'document':
+                            if corpo_ini is not None and corpo_fim is None:
+                                corpo_fim = inicio_comando
+                                asset_atual = None
+                                parte, i_asset = self._montar_parte(''.join(out[indice_parte:indice_comando]), ini_parte,
+                                                                    corpo_fim, assets, i_asset, ini_parte)
+                                parte['titulo'] = titulo_secao
+                                yield parte
+                        elif asset_atual is not None and ambiente.rstrip('*') == asset_atual[0]:
+                            asset_atual[2] -= 1
+                            if asset_atual[2] == 0:
+                                assets.append((asset_atual[1], pos, asset_atual[3]))
+                                asset_atual = None
+                continue
+
+            if grupo == 'comando':
+                tipo = _COMANDOS_ARGUMENTO.get(valor)
+                if tipo is None and valor.lower() in ('\\title', '\\author'):
+                    tipo = _COMANDOS_ARGUMENTO[valor.lower()]
+                esperando = (tipo, inicio, len(out) - 1) if tipo is not None else None
+                continue
+
+            # Texto comum cancela um comando que aguardava argumento
+            esperando = None
+            if bruto[-1].isspace():
+                espaco_pendente = True
+
+        estado['texto'] = ''.join(out)
+        estado['completo'] = corpo_fim is not None
+
+    def _montar_parte(self, texto, ini, fim, assets, i_asset, base=0):
+        # texto começa na posição `base` do texto normalizado; ini, fim e assets usam posições absolutas
+        # Equivalente a strip() sobre texto[ini:fim] (o texto normalizado só tem ' ' como espaço)
+        while ini < fim and texto[ini-base] == ' ':
+            ini += 1
+        while fim > ini and texto[fim-1-base] == ' ':
+            fim -= 1
+
+        pedacos = []
+        figuras = []
+        tabelas = []
+        cursor = ini
+        while i_asset < len(assets) and assets[i_asset][0] < fim:
+            a_ini, a_fim, tipo = assets[i_asset]
+            i_asset += 1
+            if a_ini < ini:
+                continue
+            pedacos.append(texto[cursor-base:a_ini-base])
+            codigo = texto[a_ini-base:a_fim-base]
+            (figuras if tipo == 'figura' else tabelas).append({'tipo': tipo, 'codigo': codigo})
+            cursor = a_fim
+        pedacos.append(texto[cursor-base:fim-base])
+        parte = {'conteudo': ''.join(pedacos), 'assets': figuras + tabelas, 'tamanho': fim - ini}
+        return parte, i_asset
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
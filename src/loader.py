@@ -0,0 +1,144 @@
+from collections import OrderedDict
+
+import threading
+import codecs
+import mmap
+import os
+import re
+
+
+
+#==============================================================================================================
+# PROJECT LOADER FOR \input / \include
+# Expande \input{} e \include{} recursivamente, com:
+#   - cache do conteúdo de cada arquivo por (caminho, mtime, tamanho), compartilhado no processo e
+#     limitado (LRU por bytes): workers de run_many e o servidor não guardam todo artigo já lido
+#   - detecção de ciclos de inclusão
+#   - iterador por pedaços (chunks), opcionalmente lendo arquivos grandes via mmap
+# Comentários são casados junto com os comandos para que \input{} comentado seja ignorado
+_PADRAO_INPUT = r'(?P<comentario>(?<!\\)%[^\n]*)|\\(?:input|include)\{(?P<arquivo>[^}]+)\}'
+_INPUT_STR = re.compile(_PADRAO_INPUT)
+_INPUT_BYTES = re.compile(_PADRAO_INPUT.encode('ascii'))
+
+
+class ProjectLoader:
+    # Cache compartilhado entre instâncias: caminho -> (mtime_ns, tamanho, conteudo),
+    # do usado há mais tempo ao mais recente
+    MAX_CACHE_BYTES = 64 << 20
+    _cache = OrderedDict()
+    _cache_bytes = 0
+    _cache_lock = threading.Lock()
+
+    def __init__(self, chunk_size=1 << 20, mmap_threshold=16 << 20):
+        self.chunk_size = chunk_size
+        self.mmap_threshold = mmap_threshold
+
+    def ler(self, caminho):
+        """
+        Lê um arquivo (utf-8) reaproveitando o conteúdo em cache se ele não mudou.
+        """
+        caminho = os.path.abspath(caminho)
+        info = os.stat(caminho)
+        cls = ProjectLoader
+        with cls._cache_lock:
+            entrada = cls._cache.get(caminho)
+            if entrada is not None and entrada[0] == info.st_mtime_ns and entrada[1] == info.st_size:
+                cls._cache.move_to_end(caminho)
+                return entrada[2]
+        with open(caminho, 'r', encoding='utf-8') as f:
+            conteudo = f.read()
+        if info.st_size > cls.MAX_CACHE_BYTES:
+            return conteudo
+        with cls._cache_lock:
+            anterior = cls._cache.pop(caminho, None)
+            if anterior is not None:
+                cls._cache_bytes -= anterior[1]
+            cls._cache[caminho] = (info.st_mtime_ns, info.st_size, conteudo)
+            cls._cache_bytes += info.st_size
+            while cls._cache_bytes > cls.MAX_CACHE_BYTES:
+                _, removida = cls._cache.popitem(last=False)
+                cls._cache_bytes -= removida[1]
+        return conteudo
+
+    @classmethod
+    def limpar_cache(cls):
+        with cls._cache_lock:
+            cls._cache.clear()
+            cls._cache_bytes = 0
+
+    def resolver(self, nome, diretorio_base):
+        # Como no LaTeX: tenta <nome>.tex e depois o nome exato
+        candidatos = [nome] if nome.endswith('.tex') else [nome + '.tex', nome]
+        for candidato in candidatos:
+            caminho = os.path.join(diretorio_base, candidato)
+            if os.path.isfile(caminho):
+                return os.path.abspath(caminho)
+        raise FileNotFoundError(f"Arquivo incluído não encontrado: {os.path.join(diretorio_base, candidatos[0])}")
+
+    def iterar(self, caminho_arquivo, arquivos=None):
+        """
+        Gera o fonte expandido em pedaços de até chunk_size caracteres.
+        Caminhos de \\input são resolvidos em relação ao diretório do arquivo principal.
+        Se `arquivos` for uma lista, recebe o caminho absoluto de cada arquivo lido, na ordem.
+        """
+        caminho = os.path.abspath(caminho_arquivo)
+        yield from self._iterar(caminho, os.path.dirname(caminho), [], arquivos)
+
+    def carregar(self, caminho_arquivo):
+        return ''.join(self.iterar(caminho_arquivo))
+
+    def _iterar(self, caminho, diretorio_base, pilha, arquivos=None):
+        if caminho in pilha:
+            ciclo = ' -> '.join(os.path.relpath(p, diretorio_base) for p in pilha[pilha.index(caminho):] + [caminho])
+            raise ValueError(f"Ciclo de \\input/\\include detectado: {ciclo}")
+        pilha.append(caminho)
+        if arquivos is not None:
+            arquivos.append(caminho)
+        if os.path.getsize(caminho) >= self.mmap_threshold:
+            yield from self._iterar_mmap(caminho, diretorio_base, pilha, arquivos)
+        else:
+            conteudo = self.ler(caminho)
+            cursor = 0
+            for match in _INPUT_STR.finditer(conteudo):
+                if match.group('arquivo') is None:
+                    continue
+                yield from self._fatiar(conteudo, cursor, match.start())
+                sub_caminho = self.resolver(match.group('arquivo').strip(), diretorio_base)
+                yield from self._iterar(sub_caminho, diretorio_base, pilha, arquivos)
+                cursor = match.end()
+            yield from self._fatiar(conteudo, cursor, len(conteudo))
+        pilha.pop()
+
+    def _fatiar(self, conteudo, inicio, fim):
+        for i in range(inicio, fim, self.chunk_size):
+            yield conteudo[i:min(fim, i + self.chunk_size)]
+
+    def _iterar_mmap(self, caminho, diretorio_base, pilha, arquivos=None):
+        # Arquivos enormes não entram no cache: são mapeados e decodificados aos poucos
+        with open(caminho, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            cursor = 0
+            for match in _INPUT_BYTES.finditer(dados):
+                if match.group('arquivo') is None:
+                    continue
+                yield from self._decodificar(decoder, dados, cursor, match.start())
+                nome = match.group('arquivo').decode('utf-8').strip()
+                sub_caminho = self.resolver(nome, diretorio_base)
+                yield from self._iterar(sub_caminho, diretorio_base, pilha, arquivos)
+                cursor = match.end()
+            yield from self._decodificar(decoder, dados, cursor, len(dados))
+            final = decoder.decode(b'', final=True)
+            if final:
+                yield final
+
+    def _decodificar(self, decoder, dados, inicio, fim):
+        for i in range(inicio, fim, self.chunk_size):
+            texto = decoder.decode(dados[i:min(fim, i + self.chunk_size)])
+            if texto:
+                yield texto
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
@@ -0,0 +1,248 @@
+from src.registry import summarizers_dict
+from src.instrumentation import ativo, rss_atual
+
+from collections import OrderedDict
+
+import contextlib
+import threading
+import logging
+import ctypes
+import timeit
+import sys
+import gc
+
+
+
+logger = logging.getLogger(__name__)
+
+
+
+def _devolver_memoria():
+    # Depois de soltar um modelo: coleta ciclos e, na glibc, devolve ao sistema as páginas livres
+    # do heap (sem isso o RSS não cai mesmo com os pesos liberados)
+    gc.collect()
+    if sys.platform.startswith('linux'):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass
+
+def _nome_modelo(model):
+    return model if isinstance(model, str) else getattr(model, '__name__', repr(model))
+
+
+
+#==============================================================================================================
+# MODEL LIFECYCLE MANAGER
+# Carrega summarizers sob demanda e os mantém carregados enquanto couberem no orçamento de memória.
+# Ao passar do orçamento, os modelos usados há mais tempo (LRU) que não estão em uso são liberados.
+# A memória de cada modelo é o maior entre os bytes dos seus tensores e o quanto o RSS do processo
+# cresceu durante a carga; o tamanho medido é lembrado para abrir espaço antes das próximas cargas.
+class _Entrada_Modelo:
+    def __init__(self, nome, summarizer, memoria, tempo_carga):
+        self.nome = nome
+        self.summarizer = summarizer
+        self.memoria = memoria
+        self.tempo_carga = tempo_carga
+        self.em_uso = 0
+        self.usos = 0
+
+
+class Model_Manager:
+    def __init__(self, orcamento_bytes=None, device=None, api_key=None):
+        self.orcamento_bytes = orcamento_bytes  # None: sem limite (só carrega sob demanda)
+        self.device = device
+        self.api_key = api_key
+        self._modelos = OrderedDict() # chave -> _Entrada_Modelo, do usado há mais tempo ao mais recente
+        self._tamanhos = {}           # chave -> memória medida na última carga (sobrevive ao despejo)
+        self._lock = threading.RLock()
+        self._carregando = {}         # chave -> threading.Event (outras threads esperam a mesma carga)
+        self.metricas_totais = {"carregamentos": 0, "despejos": 0, "acertos": 0, "tempo_carga_s": 0.0}
+
+    def _chave(self, model, device, api_key, kwargs):
+        return (_nome_modelo(model), device, api_key, repr(sorted(kwargs.items())))
+
+    @property
+    def memoria_bytes(self):
+        with self._lock:
+            return sum(entrada.memoria for entrada in self._modelos.values())
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Carga e despejo
+    def _medir(self, summarizer, rss_antes):
+        tensores = summarizer.memoria_bytes() if hasattr(summarizer, 'memoria_bytes') else None
+        rss_depois = rss_atual()
+        crescimento = rss_depois - rss_antes if rss_antes is not None and rss_depois is not None else None
+        return max(tensores or 0, crescimento or 0)
+
+    def _carregar(self, chave, model, device, api_key, kwargs):
+        classe = summarizers_dict[model] if isinstance(model, str) else model
+        # Abre espaço antes, se o tamanho do modelo já é conhecido de uma carga anterior
+        self._despejar_ate(self._tamanhos.get(chave, 0), manter_recente=False)
+        logger.info(f"Carregando modelo {chave[0]}...")
+        rss_antes = rss_atual()
+        with ativo().span("gerenciador_carga", modelo=chave[0]) as atributos:
+            start = timeit.default_timer()
+            summarizer = classe(device=device, api_key=api_key, **kwargs)
+            tempo = timeit.default_timer() - start
+            memoria = self._medir(summarizer, rss_antes)
+            atributos["memoria_bytes"] = memoria
+        ativo().contar("modelos_carregados")
+        with self._lock:
+            self._tamanhos[chave] = memoria
+            self.metricas_totais["carregamentos"] += 1
+            self.metricas_totais["tempo_carga_s"] += tempo
+        return _Entrada_Modelo(chave[0], summarizer, memoria, tempo)
+
+    def _despejar_ate(self, espaco, manter_recente=True):
+        """
+        Libera modelos fora de uso, do usado há mais tempo ao mais recente, até que `espaco`
+        bytes caibam no orçamento. Modelos em uso nunca são liberados (o orçamento pode estourar).
+        manter_recente: o último modelo usado fica, mesmo sozinho acima do orçamento (senão seria
+        recarregado a cada uso); antes de uma carga ele também pode sair.
+        """
+        if self.orcamento_bytes is None:
+            return
+        despejados = []
+        with self._lock:
+            candidatos = list(self._modelos)
+            if manter_recente:
+                candidatos = candidatos[:-1]
+            for chave in candidatos:
+                if self.memoria_bytes + espaco <= self.orcamento_bytes:
+                    break
+                entrada = self._modelos[chave]
+                if entrada.em_uso:
+                    continue
+                del self._modelos[chave]
+                despejados.append(entrada)
+        for entrada in despejados:
+            self._liberar(entrada)
+
+    def _liberar(self, entrada):
+        logger.info(f"Liberando modelo {entrada.nome} ({entrada.memoria / 2**20:.0f} MiB)")
+        if hasattr(entrada.summarizer, 'liberar'):
+            entrada.summarizer.liberar()
+        entrada.summarizer = None
+        _devolver_memoria()
+        ativo().contar("modelos_despejados")
+        with self._lock:
+            self.metricas_totais["despejos"] += 1
+
+    def _reservar(self, model, device, api_key, kwargs):
+        # Entrada carregada e marcada como em uso (não pode ser despejada até _devolver)
+        device = self.device if device is None else device
+        api_key = self.api_key if api_key is None else api_key
+        chave = self._chave(model, device, api_key, kwargs)
+        while True:
+            with self._lock:
+                entrada = self._modelos.get(chave)
+                if entrada is not None:
+                    self._modelos.move_to_end(chave)
+                    entrada.em_uso += 1
+                    entrada.usos += 1
+                    self.metricas_totais["acertos"] += 1
+                    return chave, entrada
+                evento = self._carregando.get(chave)
+                if evento is None:
+                    evento = self._carregando[chave] = threading.Event()
+                    break
+            evento.wait()
+        try:
+            entrada = self._carregar(chave, model, device, api_key, kwargs)
+            with self._lock:
+                entrada.em_uso += 1
+                entrada.usos += 1
+                self._modelos[chave] = entrada
+        finally:
+            with self._lock:
+                del self._carregando[chave]
+            evento.set()
+        # O modelo novo pode ter passado do orçamento: os antigos saem
+        self._despejar_ate(0)
+        return chave, entrada
+
+    def _devolver(self, chave, entrada):
+        with self._lock:
+            entrada.em_uso -= 1
+        self._despejar_ate(0)
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Interface
+    @contextlib.contextmanager
+    def usar(self, model, device=None, api_key=None, **kwargs):
+        """
+        Summarizer carregado (sob demanda) para o bloco; ele não é despejado enquanto o bloco roda.
+        `model` é um identificador de summarizers_dict ou uma classe; kwargs vão para o construtor.
+            with gerenciador.usar("bart", backend="int8") as summarizer:
+                summarizer.summarize_batch(textos)
+        """
+        chave, entrada = self._reservar(model, device, api_key, kwargs)
+        try:
+            yield entrada.summarizer
+        finally:
+            self._devolver(chave, entrada)
+
+    def obter(self, model, device=None, api_key=None, **kwargs):
+        """
+        Summarizer carregado sob demanda, sem reserva: pode ser despejado na próxima carga de outro modelo.
+        """
+        chave, entrada = self._reservar(model, device, api_key, kwargs)
+        summarizer = entrada.summarizer
+        self._devolver(chave, entrada)
+        return summarizer
+
+    def liberar_todos(self):
+        with self._lock:
+            livres = [chave for chave, entrada in self._modelos.items() if not entrada.em_uso]
+            entradas = [self._modelos.pop(chave) for chave in livres]
+        for entrada in entradas:
+            self._liberar(entrada)
+
+    def metricas(self):
+        """
+        Contadores de carga/despejo, memória atual e estado de cada modelo carregado
+        (do usado há mais tempo ao mais recente).
+        """
+        with self._lock:
+            dados = dict(self.metricas_totais)
+            dados["memoria_bytes"] = sum(entrada.memoria for entrada in self._modelos.values())
+            dados["orcamento_bytes"] = self.orcamento_bytes
+            dados["rss_bytes"] = rss_atual()
+            dados["modelos"] = [
+                {"nome": entrada.nome, "memoria_bytes": entrada.memoria, "tempo_carga_s": entrada.tempo_carga,
+                 "usos": entrada.usos, "em_uso": entrada.em_uso > 0}
+                for entrada in self._modelos.values()
+            ]
+        return dados
+
+
+# Mesma interface de um summarizer, mas o modelo é emprestado do gerenciador a cada chamada
+# (e pode ser despejado entre elas). Usado pelo Summarization_Server com orçamento de memória.
+class Managed_Summarizer:
+    def __init__(self, gerenciador, model, device=None, api_key=None, **kwargs):
+        self.gerenciador = gerenciador
+        self.model = model
+        self.device = device
+        self.api_key = api_key
+        self.kwargs = kwargs
+        # Identity (cache keys, incremental builds) comes from the real model, loaded once here
+        with self._usar() as summarizer:
+            self.model_name = summarizer.model_name
+            self.prompt_template = getattr(summarizer, 'prompt_template', None)
+
+    def _usar(self):
+        return self.gerenciador.usar(self.model, self.device, self.api_key, **self.kwargs)
+
+    def summarize_batch(self, texts, max_length=130, min_length=30):
+        with self._usar() as summarizer:
+            return summarizer.summarize_batch(texts, max_length, min_length)
+
+    def summarize(self, text, max_length=130, min_length=30):
+        return self.summarize_batch([text], max_length, min_length)[0]
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
@@ -1,71 +1,551 @@
 from src.extractor import LatexIngestor
-from src.summarizer import summarizers_dict
+from src.registry import summarizers_dict
+from src.cache import Cached_Summarizer, SummaryCache
+from src.incremental import BuildManifest, identidade_modelo
 from src.to_Beamer import BeamerBuilder
+from src.compiler import LatexCompiler
+from src.graphics import Graphics_Preprocessor
+from src.document import Document, DocumentStore, fonte_com_hash
+from src.routing import Routing_Policy
+from src.instrumentation import Tracer, ativar, ativo
 
-import subprocess
+from concurrent.futures import Future
+from collections import deque
+
+import multiprocessing
+import contextlib
+import traceback
+import threading
+import logging
+import timeit
+import queue
+import time
+import os
+
+
+
+logger = logging.getLogger(__name__)
 
 
 
 #==============================================================================================================
 # CUSTOM CLASSES FOR RUNNING THE PIPELINE
 class Beamifier_Pipeline():
-    def __init__(self, model, device=None, api_key=None, _compile=False, remove_trash=True):
-        if isinstance(model,str):
-            model = summarizers_dict[model]
-        self.summarizer = model(device=device, api_key=api_key)
+    def __init__(self, model, device=None, api_key=None, _compile=False, remove_trash=True, cache=None, incremental=False,
+                 model_kwargs=None, tracer=None, trace=False, max_fila=32, graficos=False, documentos=None,
+                 gerenciador=None, roteamento=None):
+        # Model is only loaded when first needed (see summarizer property), so that
+        # run_many can hand the configuration to its workers without loading it here
+        self.model = model
+        self.device = device
+        self.api_key = api_key
+        # Extra arguments for the summarizer constructor (e.g. backend="int8", num_threads=4, chunking=True)
+        self.model_kwargs = model_kwargs or {}
         self.compile = _compile
         self.remove_trash = remove_trash
+        # cache: None (disabled), True (default location), a path or a SummaryCache
+        self.cache = cache
+        # incremental: reuses unchanged sections and skips pdflatex if the .tex didn't change
+        self.incremental = incremental
+        # tracer: Tracer shared by every run (e.g. with hooks); by default each run gets a new one
+        # trace: also writes a Chrome trace (<output>.trace.json) next to each output
+        self.tracer = tracer
+        self.trace = trace
+        # max_fila: sections waiting for summarization before the parser blocks (backpressure)
+        self.max_fila = max_fila
+        # graficos: opt-in downsampling of figure images. False (default, images untouched), True (default
+        # cache dir), a cache dir or a Graphics_Preprocessor
+        self.graficos = graficos
+        # documentos: parsed papers are saved and reused while the source doesn't change (src/document.py).
+        # None (disabled), True (default location), a cache dir or a DocumentStore
+        self.documentos = documentos
+        # gerenciador: Model_Manager shared by several pipelines (src/model_manager.py). The model is
+        # borrowed from it on each run instead of being kept by the pipeline, so it can be evicted
+        self.gerenciador = gerenciador
+        # roteamento: short/low-priority sections go to a light model (src/routing.py), the rest to `model`.
+        # None (disabled), True (default Routing_Policy) or a Routing_Policy
+        self.roteamento = roteamento
+        self._summarizer = None
+        self._summarizer_leve = None
+        self._cache_resumos = None
+        self._graficos = None
+        self._documentos = None
+
+    @property
+    def summarizer(self):
+        if self.gerenciador is not None:
+            return self._envolver(self.gerenciador.obter(self.model, self.device, self.api_key, **self.model_kwargs))
+        if self._summarizer is None:
+            model = self.model
+            if isinstance(model,str):
+                model = summarizers_dict[model]
+            self._summarizer = self._envolver(model(device=self.device, api_key=self.api_key, **self.model_kwargs))
+        return self._summarizer
+
+    @property
+    def politica_roteamento(self):
+        if self.roteamento is None or self.roteamento is False:
+            return None
+        return Routing_Policy() if self.roteamento is True else self.roteamento
+
+    @property
+    def summarizer_leve(self):
+        politica = self.politica_roteamento
+        if self._summarizer_leve is None and politica is not None:
+            model = politica.modelo
+            if isinstance(model,str):
+                model = summarizers_dict[model]
+            self._summarizer_leve = self._envolver(model(device=self.device, api_key=self.api_key, **politica.model_kwargs))
+        return self._summarizer_leve
+
+    def _envolver(self, summarizer):
+        if self.cache is not None and self.cache is not False:
+            if self._cache_resumos is None:
+                self._cache_resumos = SummaryCache() if self.cache is True else self.cache
+            summarizer = Cached_Summarizer(summarizer, self._cache_resumos)
+        return summarizer
+
+    @contextlib.contextmanager
+    def _reservar_modelo(self):
+        # With a Model_Manager, the model can't be evicted while a run is using it
+        if self.gerenciador is None:
+            yield
+            return
+        with self.gerenciador.usar(self.model, self.device, self.api_key, **self.model_kwargs):
+            yield
+
+    @property
+    def preprocessador_graficos(self):
+        if self._graficos is None and self.graficos is not None and self.graficos is not False:
+            if isinstance(self.graficos, Graphics_Preprocessor):
+                self._graficos = self.graficos
+            else:
+                self._graficos = Graphics_Preprocessor(None if self.graficos is True else self.graficos)
+        return self._graficos
+
+    @property
+    def store_documentos(self):
+        if self._documentos is None and self.documentos is not None and self.documentos is not False:
+            if isinstance(self.documentos, DocumentStore):
+                self._documentos = self.documentos
+            else:
+                self._documentos = DocumentStore(None if self.documentos is True else self.documentos)
+        return self._documentos
+
+    def _config(self):
+        # gerenciador is left out: each run_many worker loads its own model
+        return {
+            "model": self.model,
+            "device": self.device,
+            "api_key": self.api_key,
+            "model_kwargs": self.model_kwargs,
+            "_compile": self.compile,
+            "remove_trash": self.remove_trash,
+            "cache": self.cache,
+            "incremental": self.incremental,
+            "trace": self.trace,
+            "max_fila": self.max_fila,
+            "graficos": self.graficos,
+            "documentos": self.documentos,
+            "roteamento": self.roteamento,
+        }
         
     def run(self, input_path, output_path=None):
+        """
+        Gera a apresentação de input_path. Retorna o resumo da instrumentação da execução
+        (tempo por estágio, contadores de tokens/cache/retries e pico de RSS).
+        """
         if output_path is None:
             output_path = input_path[:-4]+"_beamer.tex"
-        
-        # Parser
-        print("=== 1. Lendo e Parseando LaTeX ===")
-        extractor = LatexIngestor()
-        full_text = extractor.carregar_projeto_recursivo(input_path)
 
-        sections = extractor.extrair_secoes(full_text)
-        metadata = extractor.extrair_metadados(full_text)
+        return self._executar(input_path, output_path, None)
 
-        print(f"-> Título: {metadata['titulo']}")
-        print(f"-> Seções: {len(sections)}")
+    def run_from_document(self, documento, output_path=None):
+        """
+        Como run, mas a partir de um documento já analisado (Document, ver src/document.py), sem ler o
+        fonte: vários modelos podem compartilhar um único parse.
+            doc = DocumentStore().obter("artigo/main.tex")   # ou Document.analisar(...)
+            for modelo in modelos:
+                Beamifier_Pipeline(modelo).run_from_document(doc, f"saida_{modelo}.tex")
+        """
+        if output_path is None:
+            output_path = documento.origem[:-4]+"_beamer.tex"
+        return self._executar(documento.origem, output_path, documento)
 
-        # Resumos
-        print("\n=== 2. Inicializando Engine de IA ===")
-        
+    def _executar(self, input_path, output_path, documento):
+        tracer = self.tracer if self.tracer is not None else Tracer()
+        with ativar(tracer), tracer.span("run", input=input_path), self._reservar_modelo():
+            self._run(tracer, input_path, output_path, documento)
+        if self.trace:
+            trace_path = output_path[:-4] + ".trace.json"
+            tracer.exportar_chrome(trace_path)
+            logger.info(f"-> Trace salvo em: {trace_path}")
+        return tracer.resumo()
+
+    def _resolver_modelos(self):
+        # Resolves the registry entries (cheap: backends are only imported when a model is built)
+        politica = self.politica_roteamento
+        for model in (self.model, politica.modelo if politica is not None else None):
+            if isinstance(model, str):
+                summarizers_dict[model]
+
+    def _paralelismo(self, summarizer):
+        # (workers, seções por chamada): modelos de API fazem uma requisição por seção em paralelo
+        # (o Request_Scheduler limita RPM/TPM); os demais resumem em lote, um lote por vez
+        scheduler = getattr(summarizer, 'scheduler', None)
+        if scheduler is not None:
+            if getattr(summarizer, 'pacote', False):
+                # Packed mode: one worker hands big batches to summarize_batch, which splits them
+                # into packed requests and sends those in parallel
+                return 1, summarizer.max_secoes_pacote * scheduler.max_concurrency
+            return scheduler.max_concurrency, 1
+        return 1, getattr(summarizer, 'batch_size', 8)
+
+    def _janela_lote(self, summarizer, max_lote):
+        # How long a worker waits for more sections before summarizing what it has
+        if max_lote <= 1:
+            return 0.0
+        return 0.05 if getattr(summarizer, 'pacote', False) else 0.01
+
+    def _run(self, tracer, input_path, output_path, documento=None):
+        # Model first: sections are sent to it while the document is still being read
+        logger.info("=== 1. Inicializando Engine de IA ===")
+        with tracer.span("carregar_modelo", ja_carregado=self._summarizer is not None):
+            summarizer = self.summarizer
+        roteamento = self.politica_roteamento
+        leve = None
+        if roteamento is not None:
+            with tracer.span("carregar_modelo_leve", ja_carregado=self._summarizer_leve is not None):
+                leve = self.summarizer_leve
+
+        manifest = None
+        identidade = None
+        if self.incremental:
+            manifest = BuildManifest.carregar(output_path)
+            identidade = identidade_modelo(summarizer)
+            if leve is not None:
+                identidade = f"{identidade}|{identidade_modelo(leve)}|{roteamento.identidade()}"
+
+        store = self.store_documentos
+        if documento is None and store is not None:
+            with tracer.span("carregar_documento") as atributos:
+                documento = store.buscar(input_path)
+                atributos["encontrado"] = documento is not None
+
+        # Parse -> summarize -> build overlapped: sections go to the summarization workers as soon
+        # as they are read and each frame is written, in order, as soon as its summary is ready.
+        # An already parsed document just feeds its sections
+        if documento is not None:
+            logger.info("=== 2. Documento já analisado: gerando resumos e montando Beamer (em fluxo) ===")
+            fonte_secoes = iter(documento.secoes)
+            metadados_prontos = lambda: documento.metadados
+        else:
+            logger.info("=== 2. Lendo LaTeX, gerando resumos e montando Beamer (em fluxo) ===")
+            extractor = LatexIngestor()
+            estado = {}
+            pedacos = None
+            if store is not None:
+                # The source hash (document store key) is computed while the parser reads it
+                pedacos, hash_lido = fonte_com_hash(input_path, extractor.loader)
+            fonte_secoes = extractor.iterar_secoes(input_path, estado, pedacos)
+            def metadados_prontos():
+                # Title/author are final once both were seen
+                if estado['titulo'] is not None and estado['autor'] is not None:
+                    return extractor.extrair_metadados(estado)
+                return None
+        builder = BeamerBuilder()
+        # Figure images are downsampled in the background as soon as their section is read
+        graficos = self.preprocessador_graficos
+        base_dir = os.path.dirname(os.path.abspath(input_path))
+        preparar_assets = None
+        if graficos is not None:
+            preparar_assets = lambda assets: graficos.reescrever_assets(assets, base_dir)
+        escritor = _Escritor_Ordenado(builder, output_path, preparar_assets)
+        workers, max_lote = self._paralelismo(summarizer)
+        estagio = _Estagio_Resumo(summarizer, workers, max_lote, self.max_fila, janela_lote=self._janela_lote(summarizer, max_lote))
+        sections = []
+        reaproveitadas = 0
+        roteadas = 0
+        try:
+            with tracer.span("parse", documento=documento is not None) as atributos:
+                for section in fonte_secoes:
+                    sections.append(section)
+                    if graficos is not None:
+                        graficos.iniciar(section.get('assets', []), base_dir)
+                    topicos = manifest.topicos_reaproveitaveis(section, identidade) if manifest is not None else None
+                    if topicos is not None:
+                        reaproveitadas += 1
+                        futuro = Future()
+                        futuro.set_result(topicos)
+                    elif leve is not None and roteamento.leve(section):
+                        # Light model answers in milliseconds: summarized right here, heavy workers keep going
+                        roteadas += 1
+                        futuro = Future()
+                        with tracer.span("resumo_leve", modelo=leve.model_name):
+                            futuro.set_result(leve.summarize(section['conteudo']))
+                    else:
+                        futuro = estagio.enviar(section['conteudo'])
+                    escritor.adicionar(section, futuro)
+                    metadados = metadados_prontos()
+                    if metadados is not None:
+                        escritor.escrever_prontos(metadados)
+                atributos["secoes"] = len(sections)
+            estagio.encerrar_entrada()
+
+            if documento is None:
+                metadata = extractor.extrair_metadados(estado)
+                if store is not None:
+                    # Next runs (with any model) skip the parse while the source doesn't change
+                    for _ in pedacos:
+                        pass # whatever the parser didn't need still goes into the hash
+                    with tracer.span("salvar_documento"):
+                        store.guardar(Document(input_path, metadata, sections, *hash_lido()))
+            else:
+                metadata = documento.metadados
+            logger.info(f"-> Título: {metadata['titulo']}")
+            logger.info(f"-> Seções: {len(sections)}")
+            if reaproveitadas:
+                logger.info(f"Reaproveitando {reaproveitadas} seções inalteradas do último build")
+                tracer.contar("secoes_reaproveitadas", reaproveitadas)
+            if roteadas:
+                logger.info(f"{roteadas} seções resumidas pelo modelo leve ({leve.model_name})")
+                tracer.contar("secoes_roteadas_leve", roteadas)
+
+            with tracer.span("montar"):
+                final_path = escritor.fechar(metadata)
+        except BaseException:
+            estagio.fechar(cancelar=True)
+            escritor.abortar()
+            raise
+        finally:
+            if graficos is not None:
+                graficos.fechar() # image threads don't outlive the run
+        estagio.fechar()
+        all_bullet_points = escritor.topicos
+
+        logger.info(f"[SUCESSO] Arquivo .tex gerado em: {final_path}")
 
-        slides = []
-        print("\n=== 3. Gerando Resumos ===")
-        for i, section in enumerate(sections):
-            print(f"Processando [{i+1}/{len(sections)}]: {section['titulo']}...")
-            bullet_points = self.summarizer.summarize(section['conteudo'])
-            slides.append({
+        tex_hash = None
+        if manifest is not None:
+            # Sections the API failed on are not reused: they are summarized again next run
+            falha = getattr(summarizer, 'mensagem_falha', None)
+            manifest.registrar_secoes(sections, [None if t == [falha] else t for t in all_bullet_points], identidade)
+            tex_hash = manifest.registrar_tex(final_path)
+
+        if self.compile:
+            pdf_path = final_path[:-4] + ".pdf"
+            if manifest is not None and not manifest.precisa_compilar(tex_hash, pdf_path):
+                logger.info("=== 3. PDF já atualizado (.tex idêntico ao último build), compilação ignorada ===")
+            else:
+                logger.info("=== 3. Compilando PDF Beamer ===")
+                compiler = LatexCompiler(preambulo_fixo=builder.preambulo_fixo())
+                with tracer.span("compilar") as atributos:
+                    resultado = compiler.compilar(final_path, remove_trash=self.remove_trash)
+                    atributos["passes"] = len(resultado["passes"])
+                    atributos["sucesso"] = resultado["sucesso"]
+                tempos = ", ".join(f"{p['tempo']:.2f}s" for p in resultado["passes"])
+                logger.info(f"-> {len(resultado['passes'])} passada(s) ({tempos})"
+                            + (" com formato pré-compilado" if resultado["formato"] else ""))
+                if not resultado["sucesso"]:
+                    logger.error(f"[ERRO] pdfLaTeX não gerou o PDF (ver {final_path[:-4]}.log)")
+                elif manifest is not None:
+                    manifest.registrar_compilacao(tex_hash)
+
+        if manifest is not None:
+            manifest.salvar()
+
+    def run_many(self, inputs, outputs=None, workers=None):
+        """
+        Converte vários documentos usando um pool de processos. Cada worker carrega
+        o summarizer uma única vez e o reutiliza para todos os documentos que recebe.
+        Falhas são reportadas por documento, sem interromper o lote.
+        Retorna uma lista de dicionários (input, output, sucesso, erro, tempo, metricas) na ordem de `inputs`.
+        """
+        inputs = list(inputs)
+        if outputs is None:
+            outputs = [None] * len(inputs)
+        outputs = list(outputs)
+        if len(outputs) != len(inputs):
+            raise ValueError("inputs e outputs devem ter o mesmo tamanho")
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = max(1, min(workers, len(inputs)))
+
+        if workers == 1:
+            global _worker_pipeline
+            _worker_pipeline = self
+            return [_executar_documento(i, o) for i, o in zip(inputs, outputs)]
+
+        # An unknown model identifier fails here, once, instead of in every worker
+        try:
+            self._resolver_modelos()
+        except Exception:
+            erro = traceback.format_exc()
+            return [_resultado_falha(i, o, erro) for i, o in zip(inputs, outputs)]
+
+        # spawn: processos limpos, sem herdar estado de torch/grpc do processo pai
+        contexto = multiprocessing.get_context("spawn")
+        nivel_log = logging.getLogger().getEffectiveLevel()
+        with contexto.Pool(workers, initializer=_inicializar_worker, initargs=(self._config(), nivel_log)) as pool:
+            return pool.starmap(_executar_documento, zip(inputs, outputs), chunksize=1)
+
+
+class _Estagio_Resumo:
+    """
+    Workers que resumem as seções de uma fila limitada (o produtor bloqueia quando ela enche).
+    Cada worker junta em um único summarize_batch as seções que já estiverem na fila (até max_lote),
+    esperando até janela_lote segundos por mais seções.
+    """
+    def __init__(self, summarizer, workers=1, max_lote=1, max_fila=32, janela_lote=0.0):
+        self.summarizer = summarizer
+        self.max_lote = max_lote
+        self.janela_lote = janela_lote
+        self.fila = queue.Queue(max_fila)
+        self._cancelado = False
+        self._encerrada = False
+        self._threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def enviar(self, texto):
+        futuro = Future()
+        self.fila.put((texto, futuro))
+        return futuro
+
+    def _coletar(self):
+        # Returns (lote, fim): fim is True when the stop sentinel was taken
+        item = self.fila.get()
+        if item is None:
+            return [], True
+        lote = [item]
+        limite = time.monotonic() + self.janela_lote
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            try:
+                item = self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return lote, True
+            lote.append(item)
+        return lote, False
+
+    def _loop(self):
+        fim = False
+        while not fim:
+            lote, fim = self._coletar()
+            if not lote:
+                continue
+            if self._cancelado:
+                for _, futuro in lote:
+                    futuro.cancel()
+                continue
+            try:
+                with ativo().span("resumir_lote", secoes=len(lote)):
+                    topicos = self.summarizer.summarize_batch([texto for texto, _ in lote])
+            except BaseException as exc:
+                for _, futuro in lote:
+                    futuro.set_exception(exc)
+                continue
+            for (_, futuro), bullet_points in zip(lote, topicos):
+                futuro.set_result(bullet_points)
+
+    def encerrar_entrada(self):
+        # One stop sentinel per worker after the last section: workers stop waiting for more
+        if not self._encerrada:
+            self._encerrada = True
+            for _ in self._threads:
+                self.fila.put(None)
+
+    def fechar(self, cancelar=False):
+        # cancelar: sections still in the queue are dropped (e.g. after an error)
+        self._cancelado = self._cancelado or cancelar
+        self.encerrar_entrada()
+        for thread in self._threads:
+            thread.join()
+
+
+class _Escritor_Ordenado:
+    """
+    Escreve os slides na ordem das seções, cada um assim que o resumo da seção e os
+    de todas as anteriores estiverem prontos.
+    """
+    def __init__(self, builder, output_path, preparar_assets=None):
+        self.builder = builder
+        self.output_path = output_path
+        self.preparar_assets = preparar_assets # assets -> assets, applied right before writing
+        self.writer = None
+        self.pendentes = deque() # (section, futuro)
+        self.topicos = []        # bullet points already written, in order
+
+    def adicionar(self, section, futuro):
+        self.pendentes.append((section, futuro))
+
+    def escrever_prontos(self, metadados, bloquear=False):
+        while self.pendentes:
+            section, futuro = self.pendentes[0]
+            if not bloquear and not futuro.done():
+                return
+            bullet_points = futuro.result()
+            if self.writer is None:
+                self.writer = self.builder.abrir(self.output_path, metadados)
+            self.pendentes.popleft()
+            assets = section.get("assets", [])
+            if self.preparar_assets is not None:
+                assets = self.preparar_assets(assets)
+            self.writer.adicionar_slide({
                 "titulo": section['titulo'],
                 "conteudo": bullet_points,
-                "assets": section.get("assets", [])
+                "assets": assets
             })
+            self.topicos.append(bullet_points)
 
-        # Geracao de beamer
-        print("\n=== 4. Montando Beamer final ===")
-        builder = BeamerBuilder()
+    def fechar(self, metadados):
+        self.escrever_prontos(metadados, bloquear=True)
+        if self.writer is None:
+            self.writer = self.builder.abrir(self.output_path, metadados)
+        self.writer.fechar()
+        return os.path.abspath(self.output_path)
 
-        final_path = builder.montar_apresentacao_completa(
-            slides, 
-            output_path, 
-            metadados=metadata
-        )
+    def abortar(self):
+        if self.writer is not None:
+            self.writer.abortar()
 
-        print(f"\n[SUCESSO] Arquivo .tex gerado em: {final_path}")
 
-        if self.compile:
-            print("\n=== 5. Compilando PDF Beamer ===")
-            command = ["pdflatex", "-interaction=batchmode", 
-                        f'-output-directory={"/".join(output_path.split("/")[:-1])}',
-                        f'{final_path}']
-            subprocess.run(command)
-            if self.remove_trash:
-                for extension in ["aux", "log", "nav", "out", "snm", "toc"]:
-                    command = ["rm", f'{output_path[:-4]+"."+extension}']
-                    subprocess.run(command)
-#==============================================================================================================
\ No newline at end of file
+# Pipeline of each run_many worker process (created once by _inicializar_worker) and the error
+# raised while loading its model, if any
+_worker_pipeline = None
+_worker_erro = None
+
+def _inicializar_worker(config, nivel_log=logging.WARNING):
+    global _worker_pipeline, _worker_erro
+    # spawn: the worker doesn't inherit the parent's logging configuration
+    logging.basicConfig(level=nivel_log, format="[%(processName)s] %(message)s")
+    _worker_pipeline = Beamifier_Pipeline(**config)
+    try:
+        _worker_pipeline.summarizer # Loads the model once per worker
+    except Exception:
+        # Raising here would make the Pool respawn the worker forever: each document reports it instead
+        _worker_erro = traceback.format_exc()
+
+def _resultado_falha(input_path, output_path, erro):
+    if output_path is None:
+        output_path = input_path[:-4]+"_beamer.tex"
+    return {"input": input_path, "output": output_path, "sucesso": False, "erro": erro, "metricas": None, "tempo": 0.0}
+
+def _executar_documento(input_path, output_path):
+    if _worker_erro is not None:
+        return _resultado_falha(input_path, output_path, _worker_erro)
+    start = timeit.default_timer()
+    resultado = {"input": input_path, "output": output_path, "sucesso": True, "erro": None, "metricas": None}
+    try:
+        if output_path is None:
+            output_path = input_path[:-4]+"_beamer.tex"
+            resultado["output"] = output_path
+        resultado["metricas"] = _worker_pipeline.run(input_path, output_path)
+    except Exception:
+        resultado["sucesso"] = False
+        resultado["erro"] = traceback.format_exc()
+    resultado["tempo"] = round(timeit.default_timer() - start, 2)
+    return resultado
+#==============================================================================================================
@@ -0,0 +1,95 @@
+from collections.abc import Mapping
+
+import functools
+import importlib
+import threading
+
+
+
+#==============================================================================================================
+# LAZY SUMMARIZER REGISTRY
+# Mapeia identificador -> classe do summarizer. As entradas podem ser a própria classe ou
+# uma string "modulo:Classe", importada só quando o modelo é acessado pela primeira vez.
+# Prefixos registrados geram entradas dinâmicas: "servidor:bart" -> Remote_Summarizer("bart", ...)
+# Entradas ocultas (o 'stub' dos benchmarks e o 'extrativo' do roteamento) são resolvidas pelo nome,
+# mas não aparecem ao iterar: quem percorre o registro (test.py) vê só os modelos de resumo completos.
+# Nenhuma dependência pesada (transformers, torch, google.generativeai) é importada aqui.
+class Summarizer_Registry(Mapping):
+    def __init__(self, entradas=None, prefixos=None, ocultas=None):
+        self._entradas = dict(entradas or {})
+        self._prefixos = dict(prefixos or {})
+        self._ocultas = dict(ocultas or {})
+        self._resolvidas = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _importar(alvo):
+        if isinstance(alvo, str):
+            modulo, atributo = alvo.split(':')
+            return getattr(importlib.import_module(modulo), atributo)
+        return alvo
+
+    def _prefixo(self, nome):
+        if nome not in self._entradas and nome not in self._ocultas and ':' in nome:
+            prefixo, resto = nome.split(':', 1)
+            if prefixo in self._prefixos:
+                return prefixo, resto
+        return None
+
+    def registrar_prefixo(self, prefixo, alvo):
+        with self._lock:
+            self._prefixos[prefixo] = alvo
+
+    def registrar(self, nome, alvo, oculta=False):
+        with self._lock:
+            (self._ocultas if oculta else self._entradas)[nome] = alvo
+            (self._entradas if oculta else self._ocultas).pop(nome, None)
+            self._resolvidas.pop(nome, None)
+
+    def __getitem__(self, nome):
+        classe = self._resolvidas.get(nome)
+        if classe is not None:
+            return classe
+        dinamico = self._prefixo(nome)
+        if dinamico is not None:
+            prefixo, resto = dinamico
+            classe = functools.partial(self._importar(self._prefixos[prefixo]), resto)
+        elif nome in self._ocultas:
+            classe = self._importar(self._ocultas[nome])
+        else:
+            classe = self._importar(self._entradas[nome])
+        with self._lock:
+            self._resolvidas[nome] = classe
+        return classe
+
+    def __iter__(self):
+        return iter(self._entradas)
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, nome):
+        return nome in self._entradas or nome in self._ocultas or self._prefixo(nome) is not None
+#==============================================================================================================
+
+
+
+summarizers_dict = Summarizer_Registry({
+    'bart':                  'src.summarizer:bart_large_cnn_summarizer',
+    'destilbart':            'src.summarizer:destilbart_cnn_summarizer',
+    't5_portuguese_small':   'src.summarizer:t5_portuguese_small_summarizer',
+    'gemini_2.0_flash_lite': 'src.summarizer:gemini_2_0_flash_lite',
+    'gemini_2.5_flash_lite': 'src.summarizer:gemini_2_5_flash_lite',
+    'gemma-3-27b-it':        'src.summarizer:gemma_3_27b_it',
+    'gemma-3-12b-it':        'src.summarizer:gemma_3_12b_it'
+}, prefixos={
+    'servidor':              'src.server:Remote_Summarizer'
+}, ocultas={
+    'stub':                  'src.summarizer:stub_summarizer',
+    'extrativo':             'src.summarizer:extractive_summarizer'
+})
+
+
+
+if __name__=='__main__':
+    pass
@@ -0,0 +1,184 @@
+from src.instrumentation import ativo, percentil
+
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from collections import deque
+
+import threading
+import random
+import time
+
+
+
+#==============================================================================================================
+# ERROR CLASSIFICATION
+# Sem importar as exceções das bibliotecas (google.api_core, requests, grpc): nome da classe,
+# código HTTP e mensagem.
+_NOMES_COTA = ('ResourceExhausted', 'TooManyRequests')
+_NOMES_TRANSITORIOS = ('DeadlineExceeded', 'ServiceUnavailable', 'InternalServerError', 'ServerError',
+                       'GatewayTimeout', 'BadGateway', 'Aborted', 'Unavailable', 'RetryError')
+_CODIGOS_TRANSITORIOS = (408, 500, 502, 503, 504)
+_MENSAGENS_TRANSITORIAS = ('503', '504', 'unavailable', 'deadline', 'timed out', 'timeout',
+                           'connection reset', 'connection aborted', 'temporarily')
+
+def erro_de_cota(exc):
+    """
+    Identifica erros de cota/limite (HTTP 429, ResourceExhausted do google.api_core).
+    """
+    if type(exc).__name__ in _NOMES_COTA:
+        return True
+    if getattr(exc, 'code', None) == 429:
+        return True
+    mensagem = str(exc).lower()
+    return '429' in mensagem or 'quota' in mensagem or 'rate limit' in mensagem
+
+def erro_transitorio(exc):
+    """
+    Erros que costumam passar com uma nova tentativa: cota, prazo esgotado, falhas de
+    conexão e erros 5xx do servidor. Erros de requisição (chave inválida, conteúdo
+    bloqueado, 400...) não são refeitos.
+    """
+    if erro_de_cota(exc) or isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if type(exc).__name__ in _NOMES_TRANSITORIOS:
+        return True
+    if getattr(exc, 'code', None) in _CODIGOS_TRANSITORIOS:
+        return True
+    mensagem = str(exc).lower()
+    return any(trecho in mensagem for trecho in _MENSAGENS_TRANSITORIAS)
+#==============================================================================================================
+
+
+
+#==============================================================================================================
+# TAIL LATENCY STATISTICS
+# Janela das últimas N latências (em segundos) de um modelo; os percentis alimentam a decisão
+# de hedge e ficam expostos em Request_Scheduler.estatisticas().
+class Estatisticas_Latencia:
+    def __init__(self, janela=1000):
+        self._amostras = deque(maxlen=janela)
+        self._lock = threading.Lock()
+        self.contadores = {"sucessos": 0, "falhas": 0, "prazos_esgotados": 0}
+
+    def registrar(self, segundos):
+        with self._lock:
+            self._amostras.append(segundos)
+            self.contadores["sucessos"] += 1
+
+    def contar(self, nome):
+        with self._lock:
+            self.contadores[nome] = self.contadores.get(nome, 0) + 1
+
+    def __len__(self):
+        return len(self._amostras)
+
+    def percentil(self, p):
+        with self._lock:
+            amostras = sorted(self._amostras)
+        return percentil(amostras, p) if amostras else None
+
+    def resumo(self):
+        with self._lock:
+            amostras = sorted(self._amostras)
+            dados = dict(self.contadores)
+        dados["amostras"] = len(amostras)
+        if amostras:
+            for p in (50, 90, 95, 99):
+                dados[f"p{p}_s"] = percentil(amostras, p)
+            dados["max_s"] = amostras[-1]
+        return dados
+#==============================================================================================================
+
+
+
+#==============================================================================================================
+# RESILIENCE POLICY FOR API CALLS
+# Cada tentativa roda em uma thread daemon: quando o prazo esgota a chamada é abandonada
+# (não dá para interromper a biblioteca no meio de uma requisição) e o chamador segue para
+# a próxima tentativa. Threads daemon não seguram o fim do processo se a chamada nunca voltar.
+# Com hedge_percentil, uma tentativa que passa do percentil de latência do modelo ganha uma
+# cópia; vale a primeira resposta que chegar.
+def _em_segundo_plano(funcao, estatisticas):
+    futuro = Future()
+    def alvo():
+        if not futuro.set_running_or_notify_cancel():
+            return
+        inicio = time.monotonic()
+        try:
+            resultado = funcao()
+        except BaseException as exc:
+            estatisticas.contar("falhas")
+            futuro.set_exception(exc)
+        else:
+            # Chamadas abandonadas também entram: os percentis medem a API, não o chamador
+            estatisticas.registrar(time.monotonic() - inicio)
+            futuro.set_result(resultado)
+    threading.Thread(target=alvo, daemon=True, name="beamifier-api").start()
+    return futuro
+
+
+class Politica_Resiliencia:
+    def __init__(self, timeout=120.0, max_retries=5, backoff_base=2.0, backoff_max=60.0,
+                 hedge_percentil=None, hedge_min_amostras=20, hedge_atraso_min=1.0):
+        self.timeout = timeout                          # prazo de cada tentativa (None: sem prazo)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentil = hedge_percentil          # ex.: 95 -> cópia após o p95 de latência
+        self.hedge_min_amostras = hedge_min_amostras    # latências observadas antes de confiar no percentil
+        self.hedge_atraso_min = hedge_atraso_min        # nunca duplica antes disso (segundos)
+
+    def backoff(self, tentativa):
+        # Exponencial com jitter: evita que as threads voltem todas ao mesmo tempo
+        espera = min(self.backoff_max, self.backoff_base * (2 ** tentativa))
+        return espera * random.uniform(0.5, 1.0)
+
+    def atraso_hedge(self, estatisticas):
+        if self.hedge_percentil is None or len(estatisticas) < self.hedge_min_amostras:
+            return None
+        return max(self.hedge_atraso_min, estatisticas.percentil(self.hedge_percentil))
+
+    def tentar(self, funcao, estatisticas, liberar_hedge=None):
+        """
+        Uma tentativa de `funcao()` com prazo e, se configurado, hedge.
+        liberar_hedge() diz se a cópia cabe no orçamento agora (ex.: RateLimiter.tentar);
+        se não couber, a tentativa segue sem cópia.
+        Levanta TimeoutError quando o prazo esgota sem resposta.
+        """
+        inicio = time.monotonic()
+        prazo = inicio + self.timeout if self.timeout is not None else None
+        atraso = self.atraso_hedge(estatisticas)
+        instante_hedge = inicio + atraso if atraso is not None else None
+        futuros = [_em_segundo_plano(funcao, estatisticas)]
+        pendentes = set(futuros)
+        while True:
+            limites = [t for t in (prazo, instante_hedge) if t is not None]
+            espera = max(0.0, min(limites) - time.monotonic()) if limites else None
+            feitos, pendentes = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                if futuro.exception() is None:
+                    if futuro is not futuros[0]:
+                        ativo().contar("api_hedges_vencedores")
+                        estatisticas.contar("hedges_vencedores")
+                    return futuro.result()
+            if not pendentes:
+                # Todas falharam: o erro da chamada original decide se haverá retry
+                raise futuros[0].exception()
+            agora = time.monotonic()
+            if instante_hedge is not None and agora >= instante_hedge:
+                instante_hedge = None
+                if liberar_hedge is None or liberar_hedge():
+                    ativo().contar("api_hedges")
+                    estatisticas.contar("hedges")
+                    futuros.append(_em_segundo_plano(funcao, estatisticas))
+                    pendentes.add(futuros[-1])
+                continue
+            if prazo is not None and agora >= prazo:
+                ativo().contar("api_prazos_esgotados")
+                estatisticas.contar("prazos_esgotados")
+                raise TimeoutError(f"Sem resposta da API em {self.timeout:.0f}s")
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
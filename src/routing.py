@@ -0,0 +1,46 @@
+import re
+
+
+
+#==============================================================================================================
+# SECTION ROUTING POLICY
+# Decide, seção a seção, se o resumo vem do modelo leve (por padrão o extrativo, que roda em
+# milissegundos sem rede nem pesos) ou do modelo pesado do pipeline. Vão para o modelo leve:
+# - seções com menos de `max_palavras` palavras
+# - seções cujo título começa com um dos `titulos` (sem diferenciar maiúsculas)
+# - seções com prioridade(section) abaixo de `prioridade_minima`, se `prioridade` for dada
+# Só guarda configuração (o pipeline carrega o modelo): pode ir para os workers de run_many,
+# desde que `prioridade` seja uma função de módulo (lambdas não passam pelo pickle).
+TITULOS_LEVES = ("Agradecimento", "Acknowledg", "Contexto")
+
+class Routing_Policy:
+    def __init__(self, modelo="extrativo", max_palavras=200, titulos=TITULOS_LEVES, prioridade=None,
+                 prioridade_minima=0, model_kwargs=None):
+        self.modelo = modelo                    # identificador de summarizers_dict ou classe
+        self.max_palavras = max_palavras        # None: o tamanho não decide
+        self.titulos = tuple(t.lower() for t in titulos or ())
+        self.prioridade = prioridade            # função section -> número (maior = mais importante)
+        self.prioridade_minima = prioridade_minima
+        self.model_kwargs = model_kwargs or {}
+
+    def leve(self, section):
+        """
+        True se a seção deve ser resumida pelo modelo leve.
+        """
+        if self.max_palavras is not None and len(section['conteudo'].split()) < self.max_palavras:
+            return True
+        titulo = re.sub(r'\s+', ' ', section.get('titulo') or '').strip().lower()
+        if self.titulos and titulo.startswith(self.titulos):
+            return True
+        return self.prioridade is not None and self.prioridade(section) < self.prioridade_minima
+
+    def identidade(self):
+        # Entra na identidade do build incremental: mudar a política refaz as seções
+        prioridade = getattr(self.prioridade, '__qualname__', repr(self.prioridade))
+        return f"rota:{self.max_palavras}:{','.join(self.titulos)}:{prioridade}:{self.prioridade_minima}"
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
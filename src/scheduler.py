@@ -0,0 +1,172 @@
+from src.resilience import Politica_Resiliencia, Estatisticas_Latencia, erro_de_cota, erro_transitorio
+from src.instrumentation import ativo
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+
+import threading
+import time
+
+
+
+#==============================================================================================================
+# RATE LIMITING FOR API MODELS
+# Janela deslizante de 60s com orçamento de requisições (RPM) e tokens (TPM)
+class RateLimiter:
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._janela = deque() # (timestamp, tokens)
+        self._tokens_janela = 0
+        self._lock = threading.Lock()
+        self._pausa_ate = 0.0
+
+    def _limpar_janela(self, agora):
+        while self._janela and agora - self._janela[0][0] >= 60.0:
+            _, tokens = self._janela.popleft()
+            self._tokens_janela -= tokens
+
+    def _espera_necessaria(self, agora, tokens):
+        espera = max(0.0, self._pausa_ate - agora)
+        if self.rpm is not None and len(self._janela) >= self.rpm:
+            espera = max(espera, 60.0 - (agora - self._janela[0][0]))
+        if self.tpm is not None and self._janela and self._tokens_janela + tokens > self.tpm:
+            # Libera entradas antigas até caber (uma requisição maior que o TPM inteiro passa sozinha)
+            liberados = self._tokens_janela
+            for instante, t in self._janela:
+                liberados -= t
+                if liberados + tokens <= self.tpm:
+                    espera = max(espera, 60.0 - (agora - instante))
+                    break
+            else:
+                espera = max(espera, 60.0 - (agora - self._janela[-1][0]))
+        return espera
+
+    def acquire(self, tokens=0):
+        """
+        Bloqueia até que a requisição caiba no orçamento de RPM/TPM e a registra.
+        """
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._limpar_janela(agora)
+                espera = self._espera_necessaria(agora, tokens)
+                if espera <= 0:
+                    self._janela.append((agora, tokens))
+                    self._tokens_janela += tokens
+                    return
+            time.sleep(min(espera, 1.0))
+
+    def tentar(self, tokens=0):
+        """
+        Registra a requisição só se ela couber no orçamento agora, sem esperar.
+        """
+        with self._lock:
+            agora = time.monotonic()
+            self._limpar_janela(agora)
+            if self._espera_necessaria(agora, tokens) > 0:
+                return False
+            self._janela.append((agora, tokens))
+            self._tokens_janela += tokens
+            return True
+
+    def pausar(self, segundos):
+        # Usado ao receber erro de cota: segura todas as threads deste modelo
+        with self._lock:
+            self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+
+
+# Um limitador por nome de modelo, compartilhado por todas as instâncias do processo
+_limitadores = {}
+_limitadores_lock = threading.Lock()
+
+def obter_limitador(model_name, rpm=None, tpm=None):
+    with _limitadores_lock:
+        limitador = _limitadores.get(model_name)
+        if limitador is None:
+            limitador = _limitadores[model_name] = RateLimiter(rpm, tpm)
+        else:
+            if rpm is not None: limitador.rpm = rpm
+            if tpm is not None: limitador.tpm = tpm
+        return limitador
+
+
+# Latências de cada modelo, também por nome (decidem o hedge; ver src/resilience.py)
+_estatisticas = {}
+
+def obter_estatisticas(model_name):
+    with _limitadores_lock:
+        estatisticas = _estatisticas.get(model_name)
+        if estatisticas is None:
+            estatisticas = _estatisticas[model_name] = Estatisticas_Latencia()
+        return estatisticas
+#==============================================================================================================
+
+
+
+#==============================================================================================================
+# CONCURRENT REQUEST SCHEDULER
+class Request_Scheduler:
+    def __init__(self, limitador, max_concurrency=8, politica=None, estatisticas=None):
+        self.limitador = limitador
+        self.max_concurrency = max_concurrency
+        # Prazo, retries e hedge de cada chamada (src/resilience.py)
+        self.politica = politica if politica is not None else Politica_Resiliencia()
+        self.estatisticas = estatisticas if estatisticas is not None else Estatisticas_Latencia()
+
+    def executar_um(self, funcao, tokens=0):
+        """
+        Executa `funcao()` respeitando o limitador, com prazo por tentativa e refazendo a
+        chamada com backoff exponencial (com jitter) em erros transitórios. Erros de cota
+        pausam todas as threads do modelo; os demais só esta.
+        """
+        tentativa = 0
+        while True:
+            self.limitador.acquire(tokens)
+            try:
+                return self.politica.tentar(funcao, self.estatisticas, lambda: self.limitador.tentar(tokens))
+            except Exception as exc:
+                if not erro_transitorio(exc) or tentativa >= self.politica.max_retries:
+                    raise
+                espera = self.politica.backoff(tentativa)
+                if erro_de_cota(exc):
+                    self.limitador.pausar(espera)
+                else:
+                    time.sleep(espera)
+                tentativa += 1
+                ativo().contar("api_retries")
+
+    def estatisticas_latencia(self):
+        """
+        Percentis (p50/p90/p95/p99/max) das últimas chamadas à API deste modelo e
+        contadores de sucessos, falhas, prazos esgotados e hedges.
+        """
+        return self.estatisticas.resumo()
+
+    def _executar_um_tolerante(self, funcao, tokens=0):
+        try:
+            return self.executar_um(funcao, tokens)
+        except Exception as exc:
+            return exc
+
+    def executar(self, tarefas, tolerante=False):
+        """
+        Executa uma lista de (funcao, tokens) de forma concorrente e devolve os
+        resultados na mesma ordem da lista.
+        Com tolerante=True, uma tarefa que falha (depois dos retries) devolve a
+        exceção no lugar do resultado, sem interromper as demais.
+        """
+        if not tarefas:
+            return []
+        executar_um = self._executar_um_tolerante if tolerante else self.executar_um
+        if self.max_concurrency <= 1 or len(tarefas) == 1:
+            return [executar_um(funcao, tokens) for funcao, tokens in tarefas]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(tarefas))) as pool:
+            futuros = [pool.submit(executar_um, funcao, tokens) for funcao, tokens in tarefas]
+            return [futuro.result() for futuro in futuros]
+#==============================================================================================================
+
+
+
+if __name__=='__main__':
+    pass
@@ -0,0 +1,254 @@
+from src.registry import summarizers_dict
+from src.model_manager import Model_Manager, Managed_Summarizer
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future
+
+import urllib.request
+import urllib.error
+import threading
+import argparse
+import logging
+import queue
+import json
+import time
+import sys
+import os
+
+
+
+ENDERECO_PADRAO = "http://127.0.0.1:8765"
+
+logger = logging.getLogger(__name__)
+
+
+
+#==============================================================================================================
+# SUMMARIZATION DAEMON
+# Mantém modelos de summarizers_dict carregados e atende pedidos via HTTP local.
+# Pedidos de vários clientes para o mesmo modelo são agrupados em um único summarize_batch.
+class _Fila_Modelo:
+    def __init__(self, summarizer, janela_lote=0.02, max_lote=64):
+        self.summarizer = summarizer
+        self.janela_lote = janela_lote
+        self.max_lote = max_lote
+        self.fila = queue.Queue()
+        self.lotes = 0
+        self.pedidos = 0
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def enviar(self, texts, max_length, min_length):
+        futuro = Future()
+        self.fila.put((texts, max_length, min_length, futuro))
+        return futuro
+
+    def _coletar(self):
+        # Espera o primeiro pedido e junta os que chegarem dentro da janela
+        pedidos = [self.fila.get()]
+        n_textos = len(pedidos[0][0])
+        limite = time.monotonic() + self.janela_lote
+        while n_textos < self.max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                pedido = self.fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            pedidos.append(pedido)
+            n_textos += len(pedido[0])
+        return pedidos
+
+    def _loop(self):
+        while True:
+            pedidos = self._coletar()
+            # Pedidos com max/min diferentes não podem dividir a mesma chamada
+            grupos = {}
+            for pedido in pedidos:
+                grupos.setdefault((pedido[1], pedido[2]), []).append(pedido)
+            for (max_length, min_length), grupo in grupos.items():
+                texts = [t for pedido in grupo for t in pedido[0]]
+                try:
+                    topicos = self.summarizer.summarize_batch(texts, max_length, min_length)
+                except Exception as exc:
+                    for pedido in grupo:
+                        pedido[3].set_exception(exc)
+                    continue
+                self.lotes += 1
+                self.pedidos += len(grupo)
+                inicio = 0
+                for pedido in grupo:
+                    fim = inicio + len(pedido[0])
+                    pedido[3].set_result(topicos[inicio:fim])
+                    inicio = fim
+
+
+class Summarization_Server:
+    def __init__(self, modelos, host="127.0.0.1", port=8765, device=None, api_key=None,
+                 janela_lote=0.02, max_lote=64, orcamento_memoria=None):
+        # With orcamento_memoria (bytes), models are loaded on demand by a Model_Manager and the least
+        # recently used ones are released when they don't fit: more models than fit in RAM can be served
+        self.gerenciador = None
+        if orcamento_memoria is not None:
+            self.gerenciador = Model_Manager(orcamento_memoria, device=device, api_key=api_key)
+        self.filas = {}
+        for nome in modelos:
+            if self.gerenciador is not None:
+                summarizer = Managed_Summarizer(self.gerenciador, nome)
+            else:
+                logger.info(f"Carregando modelo {nome}...")
+                summarizer = summarizers_dict[nome](device=device, api_key=api_key)
+            self.filas[nome] = _Fila_Modelo(summarizer, janela_lote, max_lote)
+        self.httpd = ThreadingHTTPServer((host, port), _criar_handler(self))
+        self.httpd.daemon_threads = True
+
+    @property
+    def endereco(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def info_modelos(self):
+        return {
+            nome: {
+                "model_name": fila.summarizer.model_name,
+                "prompt_template": getattr(fila.summarizer, "prompt_template", None),
+                "lotes": fila.lotes,
+                "pedidos": fila.pedidos,
+            }
+            for nome, fila in self.filas.items()
+        }
+
+    def metricas_modelos(self):
+        # Carga/despejo de modelos (só com orçamento de memória)
+        return self.gerenciador.metricas() if self.gerenciador is not None else {}
+
+    def summarize_batch(self, modelo, texts, max_length=130, min_length=30):
+        return self.filas[modelo].enviar(texts, max_length, min_length).result()
+
+    def serve_forever(self):
+        logger.info(f"Servidor de resumos em {self.endereco} (modelos: {', '.join(self.filas)})")
+        self.httpd.serve_forever()
+
+    def iniciar_em_thread(self):
+        thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _criar_handler(servidor):
+    class Handler(BaseHTTPRequestHandler):
+        def _responder(self, status, dados):
+            corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def do_GET(self):
+            if self.path == "/modelos":
+                self._responder(200, servidor.info_modelos())
+            elif self.path == "/metricas":
+                self._responder(200, servidor.metricas_modelos())
+            else:
+                self._responder(404, {"erro": "rota desconhecida"})
+
+        def do_POST(self):
+            if self.path != "/summarize":
+                self._responder(404, {"erro": "rota desconhecida"})
+                return
+            try:
+                tamanho = int(self.headers.get("Content-Length", 0))
+                pedido = json.loads(self.rfile.read(tamanho).decode("utf-8"))
+                modelo = pedido["model"]
+                if modelo not in servidor.filas:
+                    self._responder(404, {"erro": f"modelo não carregado: {modelo}"})
+                    return
+                topicos = servidor.summarize_batch(modelo, pedido["texts"],
+                                                   pedido.get("max_length", 130), pedido.get("min_length", 30))
+            except (KeyError, ValueError) as exc:
+                self._responder(400, {"erro": f"pedido inválido: {exc}"})
+                return
+            except Exception as exc:
+                self._responder(500, {"erro": f"{type(exc).__name__}: {exc}"})
+                return
+            self._responder(200, {"topicos": topicos})
+
+        def log_message(self, formato, *args):
+            pass
+    return Handler
+#==============================================================================================================
+
+
+
+#==============================================================================================================
+# CLIENT-BACKED SUMMARIZER
+# Usado como qualquer outro modelo: summarizers_dict['servidor:bart'] ou Remote_Summarizer('bart')
+class Remote_Summarizer:
+    def __init__(self, modelo, device=None, api_key=None, url=None, timeout=600):
+        self.modelo = modelo
+        self.url = (url or os.environ.get("BEAMIFIER_SERVER") or ENDERECO_PADRAO).rstrip("/")
+        self.timeout = timeout
+        info = self._requisitar("GET", "/modelos")
+        if modelo not in info:
+            raise KeyError(f"O servidor em {self.url} não tem o modelo {modelo} carregado ({', '.join(info)})")
+        # Mesma identidade do modelo local: cache e builds incrementais continuam válidos
+        self.model_name = info[modelo]["model_name"]
+        self.prompt_template = info[modelo]["prompt_template"]
+
+    def _requisitar(self, metodo, rota, dados=None):
+        corpo = None if dados is None else json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        pedido = urllib.request.Request(self.url + rota, data=corpo, method=metodo,
+                                        headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(pedido, timeout=self.timeout) as resposta:
+                return json.loads(resposta.read().decode("utf-8"))
+        except urllib.error.HTTPError as exc:
+            erro = json.loads(exc.read().decode("utf-8") or "{}").get("erro", str(exc))
+            raise RuntimeError(f"Servidor de resumos: {erro}") from None
+
+    def summarize_batch(self, texts, max_length=130, min_length=30):
+        if not texts:
+            return []
+        resposta = self._requisitar("POST", "/summarize", {
+            "model": self.modelo, "texts": list(texts), "max_length": max_length, "min_length": min_length,
+        })
+        return resposta["topicos"]
+
+    def summarize(self, text, max_length=130, min_length=30):
+        return self.summarize_batch([text], max_length, min_length)[0]
+#==============================================================================================================
+
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor local que mantém summarizers carregados")
+    parser.add_argument("--models", nargs="+", required=True, help="identificadores de summarizers_dict")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY"))
+    parser.add_argument("--janela-lote", type=float, default=0.02, help="segundos esperando outros pedidos para o lote")
+    parser.add_argument("--orcamento-memoria", type=float, default=None, metavar="GIB",
+                        help="carrega os modelos sob demanda e libera os menos usados acima deste total (GiB)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    servidor = Summarization_Server(args.models, args.host, args.port, device=args.device,
+                                    api_key=args.api_key, janela_lote=args.janela_lote,
+                                    orcamento_memoria=None if args.orcamento_memoria is None else int(args.orcamento_memoria * 2**30))
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+    return 0
+
+
+
+if __name__=='__main__':
+    sys.exit(main())
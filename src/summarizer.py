@@ -1,29 +1,30 @@
-from transformers import pipeline, AutoTokenizer
-import google.generativeai as genai
+from src.scheduler import Request_Scheduler, obter_limitador, obter_estatisticas
+from src.resilience import Politica_Resiliencia
+from src.instrumentation import ativo
+from src.cache import CACHE_DIR_PADRAO
+from src.registry import summarizers_dict  # noqa: F401 (re-export: test.py e código antigo importam daqui)
 
-import torch
+from collections import OrderedDict
+
+import importlib.util
+import hashlib
+import logging
+import json
+import time
 import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# transformers, torch and google.generativeai are heavy (seconds and hundreds of MB to import),
+# so they are only imported when a model that needs them is instantiated
 
 
 
 #==============================================================================================================
 # GENERAL CLASSES FOR SUMMARIZERS
 # GENERAL CLASS FOR GOOGLE API MODEL
-class Google_API_Model:
-    def __init__(self, model_name, api_key=None):
-        # Basic info
-        self.model_name = model_name
-        if api_key is None:
-            api_key = os.environ[f'{model_name}_API_KEY']
-        self.api_key = api_key
-        # Gets model
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
-    
-    def summarize(self, text, max_length=130, min_length=30, prompt=None):
-        # Standard prompt (if not defined)
-        if prompt is None:
-            prompt = f"""
+PROMPT_PADRAO = """
                 Você é um especialista em criar apresentações de slides. Sua tarefa é resumir o texto a seguir em, no máximo, 5 bullet points concisos e informativos.
                 O texto é um trecho de um artigo acadêmico ou documento técnico. Extraia apenas as informações mais cruciais.
                 Cada bullet point deve ser uma frase completa e terminar com um ponto.
@@ -36,11 +37,74 @@ class Google_API_Model:
 
                 Resumo em bullet points:
             """
-        # Gets response
-        response = self.model.generate_content(prompt)
-        raw_text = response.text.strip()
+
+# Packed mode: several sections in one request, answered as JSON keyed by section id
+PROMPT_PACOTE = """
+                Você é um especialista em criar apresentações de slides. Sua tarefa é resumir cada uma das seções a seguir em, no máximo, 5 bullet points concisos e informativos.
+                Os textos são trechos de um artigo acadêmico ou documento técnico. Extraia apenas as informações mais cruciais.
+                Cada bullet point deve ser uma frase completa e terminar com um ponto.
+                Limite o resumo de cada seção a no máximo {max_length} tokens.
+
+                Responda apenas com um objeto JSON, sem nenhum texto fora dele, com uma entrada para cada seção:
+                {"<id da seção>": ["bullet point 1", "bullet point 2", ...]}
+
+                Seções para resumir:
+                {secoes}
+            """
+_CERCA_CODIGO = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+class Google_API_Model:
+    prompt_template = PROMPT_PADRAO
+    prompt_pacote = PROMPT_PACOTE
+    mensagem_falha = "Não foi possível gerar um resumo com a API."
+    # Default per-model budgets (free tier); None means unlimited
+    rpm_padrao = None
+    tpm_padrao = None
+    # Packed mode limits: input context and output tokens of the model, sections per request
+    contexto_tokens = 32768
+    max_tokens_saida = 8192
+    max_secoes_pacote = 20
+    margem_pacote = 0.8         # the ~4 chars/token estimate is rough: only fill part of the budget
+    json_nativo = False         # model accepts response_mime_type="application/json"
+
+    def __init__(self, model_name, api_key=None, client=None, max_concurrency=8, rpm=None, tpm=None, pacote=False,
+                 timeout=120.0, max_retries=5, hedge_percentil=None):
+        # Basic info. Packed replies differ from one-section replies: the identity used by the summary cache
+        # and the incremental manifest tells them apart (the API name, limiter and statistics stay shared)
+        self.model_name = f"{model_name}+pacote" if pacote else model_name
+        self.pacote = pacote
+        # Gets model (client can be any object exposing generate_content, e.g. a local fake)
+        if client is None:
+            if api_key is None:
+                api_key = os.environ[f'{model_name}_API_KEY']
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            client = genai.GenerativeModel(model_name)
+        self.api_key = api_key
+        self.model = client
+        # Scheduler shared by every instance of the same model name
+        limitador = obter_limitador(model_name,
+                                    rpm if rpm is not None else self.rpm_padrao,
+                                    tpm if tpm is not None else self.tpm_padrao)
+        # Deadline per call, retries on transient errors and, with hedge_percentil (e.g. 95), a duplicate
+        # request for calls slower than that percentile of the model's latency
+        politica = Politica_Resiliencia(timeout=timeout, max_retries=max_retries, hedge_percentil=hedge_percentil)
+        self.scheduler = Request_Scheduler(limitador, max_concurrency=max_concurrency, politica=politica,
+                                           estatisticas=obter_estatisticas(model_name))
+
+    def _montar_prompt(self, text, max_length, prompt=None):
+        # Standard prompt (if not defined). Custom prompts may use the same {text}/{max_length} fields
+        if prompt is None:
+            prompt = self.prompt_template
+        return prompt.replace('{max_length}', str(max_length)).replace('{text}', text)
+
+    def _estimar_tokens(self, prompt, max_length):
+        # Rough estimate (~4 characters per token) used only for the TPM budget
+        return len(prompt) // 4 + max_length
+
+    def _processar_resposta(self, raw_text):
         # Cleaning markers gemini can return, like '*' or '-'.
-        sentences = raw_text.replace('*', '').replace('-', '').split('\n')
+        sentences = raw_text.strip().replace('*', '').replace('-', '').split('\n')
         topics = []
         for sentence in sentences:
             f = sentence.strip()
@@ -49,43 +113,294 @@ class Google_API_Model:
                     f += '.'
                 topics.append(f)
         if not topics:
-             return ["Não foi possível gerar um resumo com a API."]
+             return [self.mensagem_falha]
         return topics
 
+    def _registrar_uso(self, tracer, atributos, response, full_prompt):
+        # Real usage when the API reports it, otherwise the same estimate used for the TPM budget
+        uso = getattr(response, 'usage_metadata', None)
+        atributos["tokens_entrada"] = getattr(uso, 'prompt_token_count', None) or len(full_prompt) // 4
+        atributos["tokens_saida"] = getattr(uso, 'candidates_token_count', None) or len(response.text) // 4
+        tracer.contar("tokens_entrada", atributos["tokens_entrada"])
+        tracer.contar("tokens_saida", atributos["tokens_saida"])
+
+    def _tarefa(self, text, max_length, prompt):
+        full_prompt = self._montar_prompt(text, max_length, prompt)
+        def chamada():
+            tracer = ativo()
+            with tracer.span("api_chamada", modelo=self.model_name) as atributos:
+                response = self.model.generate_content(full_prompt)
+                if tracer.habilitado:
+                    self._registrar_uso(tracer, atributos, response, full_prompt)
+            return self._processar_resposta(response.text)
+        return chamada, self._estimar_tokens(full_prompt, max_length)
+    
+    def _falha(self, exc):
+        # A section whose calls all failed gets the failure message instead of aborting the whole run
+        # (Cached_Summarizer and the incremental manifest don't keep it, so it is retried next time)
+        logger.warning(f"[{self.model_name}] Falha ao resumir seção: {type(exc).__name__}: {exc}")
+        ativo().contar("api_falhas")
+        return [self.mensagem_falha]
+
+    def _executar(self, tarefas):
+        return [self._falha(r) if isinstance(r, Exception) else r
+                for r in self.scheduler.executar(tarefas, tolerante=True)]
+
+    def summarize(self, text, max_length=130, min_length=30, prompt=None):
+        return self._executar([self._tarefa(text, max_length, prompt)])[0]
+
+    def summarize_batch(self, texts, max_length=130, min_length=30, prompt=None):
+        """
+        Envia todas as seções ao mesmo tempo (até max_concurrency requisições em
+        paralelo), respeitando o orçamento de RPM/TPM do modelo. Os resultados
+        voltam na ordem das seções.
+        No modo pacote, várias seções vão na mesma requisição (ver _summarize_pacotes).
+        """
+        if self.pacote and prompt is None and len(texts) > 1:
+            return self._summarize_pacotes(texts, max_length)
+        return self._executar([self._tarefa(text, max_length, prompt) for text in texts])
+
+    # ---------------------------------------------------------------------------------------------------------
+    # Packed mode
+    def _limite_pacote(self):
+        # Tokens per request: model context, capped by the whole TPM budget
+        limite = self.contexto_tokens
+        tpm = self.scheduler.limitador.tpm
+        if tpm is not None:
+            limite = min(limite, tpm)
+        return int(limite * self.margem_pacote)
+
+    def _empacotar(self, texts, max_length):
+        """
+        Divide os índices de texts no menor número de pacotes que cabem no limite de tokens
+        (first-fit decreasing). Cada pacote custa o prompt fixo + textos + saída esperada.
+        """
+        limite = self._limite_pacote()
+        limite_saida = int(self.max_tokens_saida * self.margem_pacote)
+        fixo = len(self.prompt_pacote) // 4
+        pacotes = [] # [tokens, [indices]]
+        for i in sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True):
+            custo = len(texts[i]) // 4 + 16 + max_length
+            for pacote in pacotes:
+                n = len(pacote[1])
+                if (n < self.max_secoes_pacote and pacote[0] + custo <= limite
+                        and (n + 1) * max_length <= limite_saida):
+                    pacote[0] += custo
+                    pacote[1].append(i)
+                    break
+            else:
+                pacotes.append([fixo + custo, [i]])
+        return [sorted(indices) for _, indices in pacotes]
+
+    def _montar_prompt_pacote(self, secoes, max_length):
+        # secoes: [(id, text)]
+        blocos = '\n\n'.join(f"=== SEÇÃO {id_secao} ===\n{text}" for id_secao, text in secoes)
+        return self.prompt_pacote.replace('{max_length}', str(max_length)).replace('{secoes}', blocos)
+
+    def _topicos_json(self, valor):
+        # A section's value may come as a list of bullet points or as a single text
+        if isinstance(valor, str):
+            topics = self._processar_resposta(valor)
+            return None if topics == [self.mensagem_falha] else topics
+        if not isinstance(valor, list):
+            return None
+        topics = []
+        for item in valor:
+            if not isinstance(item, str):
+                continue
+            f = item.strip().lstrip('*-• ').replace('*', '').strip()
+            if f and len(f) > 10:
+                if not f.endswith('.'):
+                    f += '.'
+                topics.append(f)
+        return topics or None
+
+    def _interpretar_pacote(self, raw_text, ids):
+        """
+        Extrai {id: tópicos} da resposta. Tolera cercas ```json, texto em volta do objeto,
+        chaves numéricas ("1" para "s1") e lista de objetos {"id": ..., "bullet_points": [...]}.
+        Seções ausentes ou inválidas simplesmente não aparecem no resultado.
+        """
+        texto = _CERCA_CODIGO.sub('', raw_text.strip())
+        dados = None
+        for candidato in (texto, texto[texto.find('{'):texto.rfind('}') + 1]):
+            try:
+                dados = json.loads(candidato)
+                break
+            except ValueError:
+                continue
+        if isinstance(dados, list):
+            dados = {str(item.get('id')): next((v for k, v in item.items() if k != 'id'), None)
+                     for item in dados if isinstance(item, dict) and 'id' in item}
+        if not isinstance(dados, dict):
+            return {}
+        normalizados = {}
+        for chave, valor in dados.items():
+            chave = str(chave).strip().lower()
+            if not chave.startswith('s'):
+                chave = 's' + chave
+            normalizados[chave] = valor
+        resultado = {}
+        for id_secao in ids:
+            topics = self._topicos_json(normalizados.get(id_secao))
+            if topics is not None:
+                resultado[id_secao] = topics
+        return resultado
+
+    def _tarefa_pacote(self, secoes, max_length):
+        full_prompt = self._montar_prompt_pacote(secoes, max_length)
+        ids = [id_secao for id_secao, _ in secoes]
+        def chamada():
+            tracer = ativo()
+            with tracer.span("api_chamada", modelo=self.model_name, secoes=len(secoes)) as atributos:
+                if self.json_nativo:
+                    response = self.model.generate_content(
+                        full_prompt, generation_config={"response_mime_type": "application/json"})
+                else:
+                    response = self.model.generate_content(full_prompt)
+                if tracer.habilitado:
+                    self._registrar_uso(tracer, atributos, response, full_prompt)
+            tracer.contar("api_pacotes")
+            return self._interpretar_pacote(response.text, ids)
+        return chamada, self._estimar_tokens(full_prompt, max_length * len(secoes))
+
+    def _summarize_pacotes(self, texts, max_length):
+        """
+        Resume texts com poucas requisições: as seções são agrupadas em pacotes que cabem no
+        contexto/TPM do modelo e a resposta JSON é separada por seção. Seções que faltarem
+        na resposta (ou pacotes que falharem) são refeitas uma a uma, com o prompt padrão.
+        """
+        pacotes = self._empacotar(texts, max_length)
+        tarefas = [self._tarefa_pacote([(f"s{k+1}", texts[i]) for k, i in enumerate(pacote)], max_length)
+                   for pacote in pacotes]
+        results = [None] * len(texts)
+        for pacote, resposta in zip(pacotes, self.scheduler.executar(tarefas, tolerante=True)):
+            if isinstance(resposta, Exception):
+                ativo().contar("api_pacotes_falhos")
+                resposta = {}
+            for k, i in enumerate(pacote):
+                results[i] = resposta.get(f"s{k+1}")
+
+        faltantes = [i for i, topics in enumerate(results) if topics is None]
+        if faltantes:
+            ativo().contar("api_fallback_secoes", len(faltantes))
+            individuais = self._executar([self._tarefa(texts[i], max_length, None) for i in faltantes])
+            for i, topics in zip(faltantes, individuais):
+                results[i] = topics
+        return results
+
 # GENERAL CLASS FOR TRANSFORMERS MODEL
+_FIM_DE_FRASE = re.compile(r'(?<=[.!?])\s+')
+
 class Transformers_Model:
-    def __init__(self, model_name, device=None):
+    prompt_template = None
+    # Map-reduce for sections longer than the model context
+    margem_contexto = 16        # room for special tokens / task prefix
+    max_rodadas_reducao = 3     # re-summarize rounds before falling back to truncation
+    max_cache_tokens = 4096
+    BACKENDS = ("eager", "int8", "onnx", "compile")
+
+    def __init__(self, model_name, device=None, batch_size=8, chunking=False, backend="eager",
+                 num_threads=None, onnx_cache_dir=None):
+        from transformers import pipeline
+        import torch
         self.model_name = model_name
+        # Inference backend: eager (fp32), int8 (dynamic quantization), onnx (ONNX Runtime) or compile (torch.compile)
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend desconhecido: {backend} (opções: {', '.join(self.BACKENDS)})")
         # Basic info
         if device is None:
-            device = "cuda:0" if torch.cuda.is_available() else "cpu"
+            device = "cuda:0" if torch.cuda.is_available() and backend not in ("int8", "onnx") else "cpu"
         self.device = device
+        self.batch_size = batch_size
+        self.chunking = chunking
+        if backend in ("int8", "onnx") and str(self.device) != "cpu":
+            raise ValueError(f"O backend {backend} só é suportado em CPU")
+        self.backend = backend
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.num_threads = num_threads
         # Gets model
-        self.summarizer = pipeline("summarization", model=self.model_name, device=self.device, truncation=True)
-    
-    def summarize(self, text, max_length=130, min_length=30):
-        # Doesn't summarize if text is already small
-        n_words = len(text.split())
-        if n_words < 40:
-            return [text]
+        if backend == "onnx":
+            self.summarizer = self._carregar_onnx(pipeline, onnx_cache_dir)
+        else:
+            self.summarizer = pipeline("summarization", model=self.model_name, device=self.device, truncation=True)
+        if backend == "int8":
+            self.summarizer.model = torch.ao.quantization.quantize_dynamic(
+                self.summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif backend == "compile":
+            modelo = self.summarizer.model
+            modelo.forward = torch.compile(modelo.forward, dynamic=True)
+        # Saídas diferem das do fp32 (int8/onnx) e das truncadas (chunking): o cache de resumos e o
+        # manifesto incremental não podem misturá-las
+        if backend in ("int8", "onnx"):
+            self.model_name = f"{model_name}@{backend}"
+        if chunking:
+            self.model_name += "+chunking"
+        self.tokenizer = self.summarizer.tokenizer
+        self.contexto = self._tamanho_contexto()
+        self._cache_tokens = OrderedDict()
+
+    def _carregar_onnx(self, pipeline, cache_dir=None):
+        # Exported graph is cached per model: only the first load pays the export
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            from transformers import AutoTokenizer
+            import onnxruntime
+        except ImportError as exc:
+            raise ImportError("O backend onnx precisa de optimum[onnxruntime] (pip install optimum[onnxruntime])") from exc
+        if cache_dir is None:
+            cache_dir = os.path.join(CACHE_DIR_PADRAO, "onnx")
+        export_dir = os.path.join(cache_dir, self.model_name.replace('/', '--'))
+        opcoes = onnxruntime.SessionOptions()
+        if self.num_threads is not None:
+            opcoes.intra_op_num_threads = self.num_threads
+        if os.path.exists(os.path.join(export_dir, "config.json")):
+            model = ORTModelForSeq2SeqLM.from_pretrained(export_dir, session_options=opcoes)
+            tokenizer = AutoTokenizer.from_pretrained(export_dir)
+        else:
+            model = ORTModelForSeq2SeqLM.from_pretrained(self.model_name, export=True, session_options=opcoes)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            model.save_pretrained(export_dir)
+            tokenizer.save_pretrained(export_dir)
+        return pipeline("summarization", model=model, tokenizer=tokenizer, device=self.device, truncation=True)
+
+    def _tamanho_contexto(self):
+        # Some tokenizers report a huge sentinel as model_max_length: fall back to the model config
+        contexto = self.tokenizer.model_max_length
+        if contexto is None or contexto > 100000:
+            config = getattr(getattr(self.summarizer, 'model', None), 'config', None)
+            contexto = getattr(config, 'max_position_embeddings', None) or getattr(config, 'n_positions', None) or 512
+        return contexto
+
+    def _contar_tokens(self, text):
+        # Real token count from the model's tokenizer, computed once per text
+        chave = hashlib.sha1(text.encode('utf-8')).digest()
+        n_tokens = self._cache_tokens.get(chave)
+        if n_tokens is None:
+            n_tokens = len(self.tokenizer(text, add_special_tokens=False)['input_ids'])
+            self._cache_tokens[chave] = n_tokens
+            if len(self._cache_tokens) > self.max_cache_tokens:
+                self._cache_tokens.popitem(last=False)
+        else:
+            self._cache_tokens.move_to_end(chave)
+        return n_tokens
 
+    def _tamanhos_dinamicos(self, n_tokens, max_length, min_length):
         # Dynamic length
-        estimated_input_len = int(n_words * 1.3)
-        dynamic_max = min(max_length, int(estimated_input_len * 0.8))
+        dynamic_max = min(max_length, int(n_tokens * 0.8))
         dynamic_min = min(min_length, int(dynamic_max * 0.5))
         
         if dynamic_max < 20: dynamic_max = 20
         if dynamic_min < 10: dynamic_min = 10
+        return dynamic_max, dynamic_min
 
-        summary_raw = self.summarizer(
-            text, 
-            max_length=dynamic_max, 
-            min_length=dynamic_min, 
-            do_sample=False, 
-            truncation=True,
-        )
-        summary = summary_raw[0]['summary_text']
+    def _preparar_geracao(self, dynamic_max):
+        # Hook called before each generate pass (see bart_large_cnn_summarizer)
+        pass
 
+    def _pos_processar(self, summary):
         # Post processing
         sentences = summary.split('. ')
         topics = []
@@ -96,6 +411,145 @@ class Transformers_Model:
                     f += '.'
                 topics.append(f)                
         return topics
+
+    def _dividir(self, text):
+        """
+        Divide o texto em janelas que cabem no contexto do modelo, quebrando em fim de frase.
+        Frases maiores que a janela são divididas por palavras.
+        """
+        janela = self.contexto - self.margem_contexto
+        sentences = _FIM_DE_FRASE.split(text)
+        contagens = [len(ids) for ids in self.tokenizer(sentences, add_special_tokens=False)['input_ids']]
+        chunks = []
+        atual, tokens_atual = [], 0
+        for sentence, n_tokens in zip(sentences, contagens):
+            if n_tokens > janela:
+                words = sentence.split()
+                n_partes = -(-n_tokens // janela)
+                passo = -(-len(words) // n_partes)
+                pedacos = [(' '.join(words[k:k+passo]), n_tokens // n_partes + 1) for k in range(0, len(words), passo)]
+            else:
+                pedacos = [(sentence, n_tokens)]
+            for pedaco, n in pedacos:
+                if atual and tokens_atual + n > janela:
+                    chunks.append(' '.join(atual))
+                    atual, tokens_atual = [], 0
+                atual.append(pedaco)
+                tokens_atual += n
+        if atual:
+            chunks.append(' '.join(atual))
+        return chunks
+
+    def _gerar(self, texts, max_length, min_length):
+        """
+        Gera os resumos brutos de uma lista de textos. Os textos são agrupados pelo tamanho
+        dinâmico (max/min) e ordenados por número de tokens, de forma que cada lote enviado ao
+        pipeline tenha entradas de tamanho parecido (pouco padding).
+        """
+        results = [None] * len(texts)
+
+        # Buckets: (dynamic_max, dynamic_min) -> [(n_tokens, index)]
+        buckets = {}
+        for i, text in enumerate(texts):
+            n_tokens = self._contar_tokens(text)
+            key = self._tamanhos_dinamicos(n_tokens, max_length, min_length)
+            buckets.setdefault(key, []).append((n_tokens, i))
+
+        tracer = ativo()
+        for (dynamic_max, dynamic_min), items in buckets.items():
+            items.sort()
+            self._preparar_geracao(dynamic_max)
+            for start in range(0, len(items), self.batch_size):
+                lote = items[start:start+self.batch_size]
+                batch = [i for _, i in lote]
+                with tracer.span("gerar_lote", modelo=self.model_name, tamanho=len(batch)) as atributos:
+                    summaries_raw = self.summarizer(
+                        [texts[i] for i in batch],
+                        max_length=dynamic_max,
+                        min_length=dynamic_min,
+                        do_sample=False,
+                        truncation=True,
+                        batch_size=len(batch),
+                    )
+                    if tracer.habilitado:
+                        saidas = [summary_raw['summary_text'] for summary_raw in summaries_raw]
+                        atributos["tokens_entrada"] = sum(n_tokens for n_tokens, _ in lote)
+                        atributos["tokens_saida"] = sum(len(ids) for ids in self.tokenizer(saidas, add_special_tokens=False)['input_ids'])
+                        tracer.contar("tokens_entrada", atributos["tokens_entrada"])
+                        tracer.contar("tokens_saida", atributos["tokens_saida"])
+                for i, summary_raw in zip(batch, summaries_raw):
+                    results[i] = summary_raw['summary_text']
+        return results
+    
+    def memoria_bytes(self):
+        """
+        Bytes dos tensores do modelo (parâmetros e buffers), ou None se não houver um modelo torch
+        (ex.: backend onnx). Pesos int8 empacotados não aparecem em parameters(): veja Model_Manager.
+        """
+        modelo = getattr(self.summarizer, 'model', None)
+        if modelo is None or not hasattr(modelo, 'parameters'):
+            return None
+        tensores = list(modelo.parameters()) + list(modelo.buffers())
+        return sum(t.numel() * t.element_size() for t in tensores)
+
+    def liberar(self):
+        """
+        Solta o pipeline (pesos, tokenizer) para que a memória possa ser devolvida, mesmo que
+        ainda exista alguma referência a este objeto. Depois disso o modelo não pode mais ser usado.
+        """
+        import torch
+        import gc
+        self.summarizer = None
+        self.tokenizer = None
+        self._cache_tokens.clear()
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def summarize(self, text, max_length=130, min_length=30):
+        return self.summarize_batch([text], max_length, min_length)[0]
+
+    def summarize_batch(self, texts, max_length=130, min_length=30):
+        """
+        Resume várias seções de uma vez, retornando as listas de tópicos na ordem de `texts`.
+        Com chunking, seções maiores que o contexto do modelo são divididas em janelas (map),
+        todas resumidas no mesmo lote, e os resumos parciais são juntados ou resumidos de
+        novo até caberem em max_length (reduce).
+        """
+        results = [None] * len(texts)
+        pendentes = {}
+        for i, text in enumerate(texts):
+            # Doesn't summarize if text is already small
+            if len(text.split()) < 40:
+                results[i] = [text]
+            else:
+                pendentes[i] = text
+
+        janela = self.contexto - self.margem_contexto
+        for rodada in range(self.max_rodadas_reducao + 1):
+            if not pendentes:
+                break
+            entradas, donos = [], []
+            for i, text in pendentes.items():
+                if self.chunking and rodada < self.max_rodadas_reducao and self._contar_tokens(text) > janela:
+                    partes = self._dividir(text)
+                else:
+                    partes = [text]
+                entradas.extend(partes)
+                donos.extend([i] * len(partes))
+
+            parciais = {}
+            for i, resumo in zip(donos, self._gerar(entradas, max_length, min_length)):
+                parciais.setdefault(i, []).append(resumo)
+
+            pendentes = {}
+            for i, resumos in parciais.items():
+                combinado = ' '.join(resumos)
+                if len(resumos) == 1 or self._contar_tokens(combinado) <= max_length:
+                    results[i] = self._pos_processar(combinado)
+                else:
+                    pendentes[i] = combinado
+        return results
 #==============================================================================================================
 
 
@@ -104,70 +558,50 @@ class Transformers_Model:
 # CUSTOM CLASSES FOR SUMMARIZERS
 # facebook/bart-large-cnn
 class bart_large_cnn_summarizer(Transformers_Model):
-    def __init__(self, device=None, api_key=None):
-        super().__init__(model_name="facebook/bart-large-cnn", device=device)
-    def summarize(self, text, max_length=130, min_length=30):
-        # Doesn't summarize if text is already small
-        n_words = len(text.split())
-        if n_words < 40:
-            return [text]
-
-        # Dynamic length
-        estimated_input_len = int(n_words * 1.3)
-        dynamic_max = min(max_length, int(estimated_input_len * 0.8))
-        dynamic_min = min(min_length, int(dynamic_max * 0.5))
-        
-        if dynamic_max < 20: dynamic_max = 20
-        if dynamic_min < 10: dynamic_min = 10
-
-        # Method not inherited soleny because of this line
-        self.summarizer.tokenizer.model_max_length = dynamic_max
-        summary_raw = self.summarizer(
-            text, 
-            max_length=dynamic_max, 
-            min_length=dynamic_min, 
-            do_sample=False, 
-            truncation=True,
-        )
-        summary = summary_raw[0]['summary_text']
-
-        # Post processing
-        sentences = summary.split('. ')
-        topics = []
-        for sentence in sentences:
-            f = sentence.strip()
-            if f and len(f) > 5:
-                if not f.endswith('.'):
-                    f += '.'
-                topics.append(f)                
-        return topics
+    def __init__(self, device=None, api_key=None, **kwargs):
+        super().__init__(model_name="facebook/bart-large-cnn", device=device, **kwargs)
+    def _preparar_geracao(self, dynamic_max):
+        # bart needs the tokenizer length tied to the generation length
+        # (with chunking the inputs already fit, so the full context is kept)
+        self.summarizer.tokenizer.model_max_length = self.contexto if self.chunking else dynamic_max
 
 # sshleifer/distilbart-cnn-12-6
 class destilbart_cnn_summarizer(Transformers_Model):
-    def __init__(self, device=None, api_key=None):
-        super().__init__(model_name="sshleifer/distilbart-cnn-12-6", device=device)
+    def __init__(self, device=None, api_key=None, **kwargs):
+        super().__init__(model_name="sshleifer/distilbart-cnn-12-6", device=device, **kwargs)
 
 # rhaymison/t5-portuguese-small-summarization
 class t5_portuguese_small_summarizer(Transformers_Model):
-    def __init__(self, device=None, api_key=None):
-        super().__init__(model_name="rhaymison/t5-portuguese-small-summarization", device=device)
+    def __init__(self, device=None, api_key=None, **kwargs):
+        super().__init__(model_name="rhaymison/t5-portuguese-small-summarization", device=device, **kwargs)
 
 # API/gemini-2.0-flash-lite
 class gemini_2_0_flash_lite(Google_API_Model):
-    def __init__(self, api_key=None, device=None):
-        super().__init__(model_name="gemini-2.0-flash-lite", api_key=api_key)
+    contexto_tokens = 1048576
+    json_nativo = True
+    rpm_padrao = 30
+    tpm_padrao = 1000000
+    def __init__(self, api_key=None, device=None, **kwargs):
+        super().__init__(model_name="gemini-2.0-flash-lite", api_key=api_key, **kwargs)
 
 # API/gemini-2.5-flash-lite
 class gemini_2_5_flash_lite(Google_API_Model):
-    def __init__(self, api_key=None, device=None):
-        super().__init__(model_name="gemini-2.5-flash-lite", api_key=api_key)
+    contexto_tokens = 1048576
+    json_nativo = True
+    rpm_padrao = 15
+    tpm_padrao = 250000
+    def __init__(self, api_key=None, device=None, **kwargs):
+        super().__init__(model_name="gemini-2.5-flash-lite", api_key=api_key, **kwargs)
 
 # API/gemma-3-27b-it
 class gemma_3_27b_it(Google_API_Model):
-    def __init__(self, api_key=None, device=None):
-        super().__init__(model_name="gemma-3-27b-it", api_key=api_key)
-    def summarize(self, text, max_length=130, min_length=30, prompt=None):
-        topics = super().summarize(text, max_length, min_length, prompt)
+    contexto_tokens = 131072
+    rpm_padrao = 30
+    tpm_padrao = 15000
+    def __init__(self, api_key=None, device=None, **kwargs):
+        super().__init__(model_name="gemma-3-27b-it", api_key=api_key, **kwargs)
+    def _processar_resposta(self, raw_text):
+        topics = super()._processar_resposta(raw_text)
         fs = topics[0].lower()
         if fs.startswith("aqui est") or fs.startswith("here`s") or fs.startswith("here’s") or fs.startswith("here's") or fs.startswith("here is"):
             topics.pop(0)
@@ -175,27 +609,185 @@ class gemma_3_27b_it(Google_API_Model):
 
 # API/gemma-3-12b-it
 class gemma_3_12b_it(Google_API_Model):
-    def __init__(self, api_key=None, device=None):
-        super().__init__(model_name="gemma-3-12b-it", api_key=api_key)
-    def summarize(self, text, max_length=130, min_length=30, prompt=None):
-        topics = super().summarize(text, max_length, min_length, prompt)
+    contexto_tokens = 131072
+    rpm_padrao = 30
+    tpm_padrao = 15000
+    def __init__(self, api_key=None, device=None, **kwargs):
+        super().__init__(model_name="gemma-3-12b-it", api_key=api_key, **kwargs)
+    def _processar_resposta(self, raw_text):
+        topics = super()._processar_resposta(raw_text)
         fs = topics[0].lower()
         if fs.startswith("aqui est") or fs.startswith("here`s") or fs.startswith("here’s") or fs.startswith("here's") or fs.startswith("here is"):
             topics.pop(0)
         return topics
-#==============================================================================================================
 
 
+# Deterministic offline stub (benchmarks / tests): no model, no network
+class stub_summarizer:
+    prompt_template = None
+    def __init__(self, device=None, api_key=None, latencia=0.0, max_topicos=5):
+        self.model_name = "stub"
+        # Simulated cost per section (seconds), to mimic a real model in pipeline benchmarks
+        self.latencia = latencia
+        self.max_topicos = max_topicos
+
+    def summarize(self, text, max_length=130, min_length=30):
+        if self.latencia:
+            time.sleep(self.latencia)
+        # First sentences of the section, each cut to a fraction of max_length words
+        limite = max(5, max_length // self.max_topicos)
+        topics = []
+        for sentence in _FIM_DE_FRASE.split(text.strip())[:self.max_topicos]:
+            words = sentence.split()
+            if words:
+                f = ' '.join(words[:limite]).rstrip('.')
+                topics.append(f + '.')
+        return topics or [text]
+
+    def summarize_batch(self, texts, max_length=130, min_length=30):
+        return [self.summarize(text, max_length, min_length) for text in texts]
 
-summarizers_dict = {
-    'bart':                  bart_large_cnn_summarizer,
-    'destilbart':            destilbart_cnn_summarizer,
-    't5_portuguese_small':   t5_portuguese_small_summarizer,
-    'gemini_2.0_flash_lite': gemini_2_0_flash_lite,
-    'gemini_2.5_flash_lite': gemini_2_5_flash_lite,
-    'gemma-3-27b-it':        gemma_3_27b_it,
-    'gemma-3-12b-it':        gemma_3_12b_it
-}
+
+# Extractive summarizer: no model, no network; sentences scored with NumPy (TextRank or TF-IDF centroid)
+_PALAVRA = re.compile(r"[^\W\d_]{3,}")
+_REFERENCIA_LATEX = re.compile(r'\s*~?\\(?:label|cite[a-z]*)\*?(?:\[[^\]]*\])*\{[^}]*\}')
+_FORMATACAO_LATEX = re.compile(r'\\(?:textit|textbf|emph|texttt|underline)\{([^{}]*)\}')
+_AMBIENTE_LATEX = re.compile(r'\\(?:begin|end)\{[^}]*\}')
+_MATEMATICA_LATEX = re.compile(r'(?<!\\)\$\$.*?(?<!\\)\$\$|(?<!\\)\$.*?(?<!\\)\$|\\\(.*?\\\)|\\\[.*?\\\]', re.S)
+_DELIMITADOR_MATEMATICA = re.compile(r'(?<!\\)\$|\\[()\[\]]')
+_COMANDO_LATEX = re.compile(r'\\(?:[A-Za-z]+\*?(?:\[[^\]]*\])*(?:\{[^{}]*\})*|\\)')
+_ESCAPE_LATEX = re.compile(r'\\([%&_#$])')
+_PARENTESES_VAZIOS = re.compile(r'\s*\(\s*\)')
+_STOPWORDS = frozenset("""
+    the and for with from that this these those are was were been being have has had not but its into over
+    such than then them they their there which while where when what who whom will would can could may might
+    also more most other some any each both only very between through during after before under about our
+    we use used using based one two three can per via new well
+    que para com por uma uns umas dos das nos nas pelo pela pelos pelas como mais mas foi são ser sua seu
+    suas seus isso esta este essa esse entre sobre quando onde também muito pode podem foram tem têm
+""".split())
+
+class extractive_summarizer:
+    prompt_template = None
+    METODOS = ("textrank", "tfidf")
+
+    def __init__(self, device=None, api_key=None, metodo="textrank", max_topicos=5, amortecimento=0.85,
+                 max_iteracoes=50, tolerancia=1e-6):
+        # numpy is only imported when scoring, but a missing install should fail here, at load time
+        if importlib.util.find_spec("numpy") is None:
+            raise ImportError("O summarizer extrativo precisa do numpy (pip install numpy)")
+        if metodo not in self.METODOS:
+            raise ValueError(f"Método desconhecido: {metodo} (opções: {', '.join(self.METODOS)})")
+        self.model_name = f"extrativo-{metodo}-{max_topicos}"
+        self.metodo = metodo
+        self.max_topicos = max_topicos
+        # TextRank (PageRank over the sentence similarity graph)
+        self.amortecimento = amortecimento
+        self.max_iteracoes = max_iteracoes
+        self.tolerancia = tolerancia
+
+    def _frases(self, text):
+        # Citations/labels are dropped and inline formatting unwrapped: the bullets are copied verbatim
+        text = _FORMATACAO_LATEX.sub(r'\1', _REFERENCIA_LATEX.sub('', text))
+        text = _AMBIENTE_LATEX.sub(' ', text)
+        frases = [f.strip() for f in _FIM_DE_FRASE.split(' '.join(text.split())) if len(f.split()) >= 4]
+        # Sentences with inline math or commands (\ref{}, \title...) would break the frame or make no
+        # sense without them: they are never candidates. Escapes become plain text (the builder escapes them
+        # again) and loose braces (left over from captions and groups) are dropped
+        limpas = []
+        for frase in frases:
+            if _DELIMITADOR_MATEMATICA.search(frase):
+                continue
+            frase = re.sub(r'[{}]', '', _ESCAPE_LATEX.sub(r'\1', frase))
+            if '\\' not in frase:
+                limpas.append(frase)
+        return limpas
+
+    def _texto_plano(self, text):
+        # Fallback when no sentence survives: the section without math, commands, braces and escapes
+        text = _FORMATACAO_LATEX.sub(r'\1', _REFERENCIA_LATEX.sub('', text))
+        text = _COMANDO_LATEX.sub(' ', _MATEMATICA_LATEX.sub('', _AMBIENTE_LATEX.sub(' ', text)))
+        text = _ESCAPE_LATEX.sub(r'\1', _DELIMITADOR_MATEMATICA.sub('', text.replace('\\$', '\0')))
+        return re.sub(r'[{}\\]', '', text).replace('\0', '$')
+
+    def _normalizar(self, frase, limite=None):
+        # Every bullet: no empty parentheses (math removed), single spaces, closing punctuation
+        palavras = _PARENTESES_VAZIOS.sub('', frase).split()
+        if limite is not None:
+            palavras = palavras[:limite]
+        frase = ' '.join(palavras)
+        if not frase:
+            return None
+        return frase if frase.endswith(('.', '!', '?')) else frase.rstrip(',;:') + '.'
+
+    def _matriz_tfidf(self, frases):
+        """
+        Matriz frases x termos com TF-IDF (IDF suavizado) e linhas normalizadas (norma L2),
+        de forma que X @ X.T seja a similaridade de cosseno entre as frases.
+        """
+        import numpy as np
+        vocabulario = {}
+        linhas, colunas = [], []
+        for i, frase in enumerate(frases):
+            for palavra in _PALAVRA.findall(frase.lower()):
+                if palavra not in _STOPWORDS:
+                    linhas.append(i)
+                    colunas.append(vocabulario.setdefault(palavra, len(vocabulario)))
+        tf = np.zeros((len(frases), max(1, len(vocabulario))))
+        np.add.at(tf, (np.asarray(linhas, dtype=np.intp), np.asarray(colunas, dtype=np.intp)), 1.0)
+        df = np.count_nonzero(tf, axis=0)
+        X = tf * (np.log((1 + len(frases)) / (1 + df)) + 1.0)
+        normas = np.linalg.norm(X, axis=1, keepdims=True)
+        return X / np.where(normas > 0, normas, 1.0)
+
+    def _pontuar(self, X):
+        import numpy as np
+        if self.metodo == "tfidf":
+            # Similarity to the section centroid
+            return X @ X.mean(axis=0)
+        n = X.shape[0]
+        S = X @ X.T
+        np.fill_diagonal(S, 0.0)
+        soma = S.sum(axis=1, keepdims=True)
+        # Row-stochastic transition matrix; sentences with no similar sentence jump anywhere
+        P = np.divide(S, soma, out=np.full_like(S, 1.0 / n), where=soma > 0)
+        d = self.amortecimento
+        r = np.full(n, 1.0 / n)
+        for _ in range(self.max_iteracoes):
+            novo = (1.0 - d) / n + d * (P.T @ r)
+            convergiu = np.abs(novo - r).sum() < self.tolerancia
+            r = novo
+            if convergiu:
+                break
+        return r
+
+    def summarize(self, text, max_length=130, min_length=30):
+        import numpy as np
+        limite = max(1, int(max_length * 0.75))
+        frases = self._frases(text)
+        if not frases:
+            topico = self._normalizar(self._texto_plano(text), limite)
+            return [topico] if topico else []
+        if len(frases) == 1:
+            return [self._normalizar(frases[0])]
+        pontuacao = self._pontuar(self._matriz_tfidf(frases))
+        # Best sentences first (ties: earlier sentence) while they fit in ~max_length tokens
+        escolhidas, palavras = [], 0
+        for i in np.argsort(-pontuacao, kind='stable'):
+            n_palavras = len(frases[i].split())
+            if escolhidas and palavras + n_palavras > limite:
+                continue
+            escolhidas.append(int(i))
+            palavras += n_palavras
+            if len(escolhidas) >= self.max_topicos:
+                break
+        # Bullets keep the order of the text
+        return [self._normalizar(frases[i]) for i in sorted(escolhidas)]
+
+    def summarize_batch(self, texts, max_length=130, min_length=30):
+        # Sections are scored independently (the result of a text doesn't depend on the batch)
+        return [self.summarize(text, max_length, min_length) for text in texts]
+#==============================================================================================================
 
 
 
@@ -1,7 +1,20 @@
+from collections import OrderedDict
+
+import threading
+import hashlib
 import os
 import re  # Adicionado para manipulação avançada de strings
 
+_PADRAO_POSICIONAMENTO = re.compile(r'\\begin\{(figure|table)\}(\[.*?\])?')
+_PADRAO_TABULAR = re.compile(r'(\\begin\{tabular.*?\})')
+
 class BeamerBuilder:
+    # Código de assets já limpo, indexado pelo hash do código original (compartilhado entre builders)
+    _cache_assets = OrderedDict()
+    max_cache_assets = 4096
+    # Tudo antes deste marcador no preâmbulo é fixo
+    MARCADOR_METADADOS = "% Metadados dinâmicos aqui"
+
     def __init__(self):
         # TODO: adicionar escolha de tema
         # Reintroduzimos o adjustbox para redimensionar TABELAS (tabular) especificamente
@@ -41,7 +54,21 @@ class BeamerBuilder:
     def _limpar_codigo_asset(self, codigo):
         """
         Limpa incompatibilidades e força redimensionamento.
+        O resultado fica em cache pelo hash do conteúdo.
         """
+        chave = hashlib.sha1(codigo.encode('utf-8')).digest()
+        cache = BeamerBuilder._cache_assets
+        limpo = cache.get(chave)
+        if limpo is not None:
+            cache.move_to_end(chave)
+            return limpo
+        limpo = self._limpar_codigo_asset_sem_cache(codigo)
+        cache[chave] = limpo
+        if len(cache) > self.max_cache_assets:
+            cache.popitem(last=False)
+        return limpo
+
+    def _limpar_codigo_asset_sem_cache(self, codigo):
         # 1. Remove asteriscos (figure* -> figure)
         codigo = codigo.replace('figure*', 'figure')
         codigo = codigo.replace('table*', 'table')
@@ -49,14 +76,13 @@ class BeamerBuilder:
         # 2. REMOVE PARÂMETROS DE POSICIONAMENTO [htbp], [h], [t!]
         # Regex: Procura \begin{table} seguido opcionalmente de [...]
         # Substitui apenas pelo \begin{table} limpo
-        codigo = re.sub(r'\\begin\{(figure|table)\}(\[.*?\])?', r'\\begin{\1}', codigo)
+        codigo = _PADRAO_POSICIONAMENTO.sub(r'\\begin{\1}', codigo)
 
         # 3. Força redimensionamento inteligente de tabelas
         # Envolve o ambiente 'tabular' em um 'adjustbox'
         if 'tabular' in codigo and 'adjustbox' not in codigo:
             # Substitui o início do tabular
-            codigo = re.sub(
-                r'(\\begin\{tabular.*?\})', 
+            codigo = _PADRAO_TABULAR.sub(
                 r'\\begin{adjustbox}{max width=\\textwidth, max height=0.75\\textheight}\n\1', 
                 codigo
             )
@@ -70,25 +96,22 @@ class BeamerBuilder:
             
         return codigo
 
-    def criar_slides_secao(self, titulo, topicos, assets):
-        """
-        Gera um ou mais frames para uma única seção.
-        """
-        slides_code = ""
+    def _gerar_slides_secao(self, titulo, topicos, assets):
+        # Gera os pedaços de código dos frames de uma seção, na ordem
         safe_titulo = titulo.replace('&', r'\&').replace('%', r'\%')
 
         # --- FRAME 1: O Resumo (Texto) ---
         if topicos: 
-            slides_code += f"\\begin{{frame}}\n"
-            slides_code += f"  \\frametitle{{{safe_titulo}}}\n"
-            slides_code += f"  \\begin{{itemize}}\n"
+            yield f"\\begin{{frame}}\n"
+            yield f"  \\frametitle{{{safe_titulo}}}\n"
+            yield f"  \\begin{{itemize}}\n"
             
             for item in topicos:
-                safe_item = item.replace('&', r'\&').replace('%', r'\%').replace('$', r'\$')
-                slides_code += f"    \\item {safe_item}\n"
+                safe_item = item.replace('&', r'\&').replace('%', r'\%').replace('$', r'\$').replace('_', r'\_').replace('#', r'\#')
+                yield f"    \\item {safe_item}\n"
                 
-            slides_code += f"  \\end{{itemize}}\n"
-            slides_code += f"\\end{{frame}}\n\n"
+            yield f"  \\end{{itemize}}\n"
+            yield f"\\end{{frame}}\n\n"
 
         # --- FRAMES EXTRAS: Tabelas e Figuras ---
         for i, asset in enumerate(assets):
@@ -97,37 +120,98 @@ class BeamerBuilder:
             
             # Mantemos o [shrink] como segurança extra, mas o trabalho pesado
             # agora é feito pelo adjustbox dentro do _limpar_codigo_asset
-            slides_code += f"\\begin{{frame}}[shrink]\n" 
-            slides_code += f"  \\frametitle{{{safe_titulo} - {tipo_label} {i+1}}}\n"
-            slides_code += f"  \\vspace{{0.2cm}}\n"
-            
-            slides_code += codigo_asset + "\n"
+            yield f"\\begin{{frame}}[shrink]\n" 
+            yield f"  \\frametitle{{{safe_titulo} - {tipo_label} {i+1}}}\n"
+            yield f"  \\vspace{{0.2cm}}\n"
             
-            slides_code += f"\\end{{frame}}\n\n"
+            yield codigo_asset + "\n"
             
-        return slides_code
+            yield f"\\end{{frame}}\n\n"
 
-    def montar_apresentacao_completa(self, lista_slides, output_path="output.tex", metadados=None):
+    def criar_slides_secao(self, titulo, topicos, assets):
+        """
+        Gera um ou mais frames para uma única seção.
+        """
+        return ''.join(self._gerar_slides_secao(titulo, topicos, assets))
+
+    def preambulo_fixo(self):
+        # Parte do preâmbulo que não depende do documento (usada no formato pré-compilado)
+        return self.base_preambulo.split(self.MARCADOR_METADADOS, 1)[0]
+
+    def montar_preambulo(self, metadados=None):
         if metadados is None:
             metadados = {"titulo": "Apresentação", "autor": ""}
-            
-        conteudo_total = self.base_preambulo.replace("{{TITULO}}", metadados['titulo'])
-        conteudo_total = conteudo_total.replace("{{AUTOR}}", metadados['autor'])
-        
-        for slide_data in lista_slides:
-            assets = slide_data.get('assets', [])
-            conteudo_total += self.criar_slides_secao(
-                slide_data['titulo'], 
-                slide_data['conteudo'], 
-                assets
-            )
-            
-        conteudo_total += self.fim
-        
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(conteudo_total)
-            
+        conteudo = self.base_preambulo.replace("{{TITULO}}", metadados['titulo'])
+        return conteudo.replace("{{AUTOR}}", metadados['autor'])
+
+    def abrir(self, output, metadados=None):
+        """
+        Abre um BeamerWriter sobre um caminho ou qualquer stream com write().
+        O preâmbulo é escrito imediatamente e cada seção adicionada vai direto para o stream.
+        """
+        return BeamerWriter(self, output, metadados)
+
+    def montar_apresentacao_completa(self, lista_slides, output_path="output.tex", metadados=None):
+        # lista_slides pode ser qualquer iterável (inclusive um gerador que produz slides aos poucos)
+        with self.abrir(output_path, metadados) as writer:
+            for slide_data in lista_slides:
+                writer.adicionar_slide(slide_data)
         return os.path.abspath(output_path)
 
+
+class BeamerWriter:
+    def __init__(self, builder, output, metadados=None, buffer_size=1 << 16):
+        self.builder = builder
+        self._fechar_stream = isinstance(output, (str, os.PathLike))
+        self._destino = self._temporario = None
+        if self._fechar_stream:
+            # Escreve ao lado do destino e só troca no fechar(): um run abortado não deixa .tex truncado
+            self._destino = os.fspath(output)
+            self._temporario = f"{self._destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+            self.stream = open(self._temporario, "w", encoding="utf-8", buffering=buffer_size)
+        else:
+            self.stream = output
+        self.n_secoes = 0
+        self.stream.write(builder.montar_preambulo(metadados))
+
+    def adicionar_secao(self, titulo, topicos, assets=()):
+        self.stream.writelines(self.builder._gerar_slides_secao(titulo, topicos, assets))
+        self.n_secoes += 1
+
+    def adicionar_slide(self, slide_data):
+        self.adicionar_secao(slide_data['titulo'], slide_data['conteudo'], slide_data.get('assets', []))
+
+    def fechar(self):
+        if self.stream is None:
+            return
+        self.stream.write(self.builder.fim)
+        if self._fechar_stream:
+            self.stream.close()
+            os.replace(self._temporario, self._destino)
+        else:
+            self.stream.flush()
+        self.stream = None
+
+    def __enter__(self):
+        return self
+
+    def abortar(self):
+        # Não deixa um .tex incompleto com cara de válido: o arquivo temporário é apagado (o destino,
+        # se já existia, fica como estava); em um stream de terceiros o \end{document} não é escrito
+        if self.stream is None:
+            return
+        if self._fechar_stream:
+            self.stream.close()
+            if os.path.exists(self._temporario):
+                os.remove(self._temporario)
+        self.stream = None
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abortar()
+            return False
+        self.fechar()
+        return False
+
 if __name__=='__main__':
     pass
\ No newline at end of file
@@ -1,23 +1,37 @@
 from src.pipeline import Beamifier_Pipeline
+from src.document import DocumentStore
+from src.model_manager import Model_Manager
 from src.summarizer import summarizers_dict
 
+import logging
 import os
 import timeit
 
 if __name__=='__main__':
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     pessoas = [
         "marcos",
         "guilherme"
     ]
     api_key = os.environ['API_KEY']
 
+    # Each paper is parsed once (and only again if its source changes) and shared by every model
+    store = DocumentStore()
+    documentos = {pessoa: store.obter(f'example/{pessoa}/main.tex') for pessoa in pessoas}
+
+    # Models are released (least recently used first) once they no longer fit in the memory budget
+    gerenciador = Model_Manager(orcamento_bytes=int(float(os.environ.get('BEAMIFIER_ORCAMENTO_GIB', 4)) * 2**30), api_key=api_key)
+
     for modelname in summarizers_dict.keys():
-        pipeline = Beamifier_Pipeline(model=modelname, api_key=api_key, _compile=True, remove_trash=True)
+        pipeline = Beamifier_Pipeline(model=modelname, api_key=api_key, _compile=True, remove_trash=True,
+                                      gerenciador=gerenciador)
         for pessoa in pessoas:
-            input_path  = f'example/{pessoa}/main.tex'
             output_path = f'example/outputs/{pessoa}_{modelname}.tex'
             
             start = timeit.default_timer()
-            pipeline.run(input_path, output_path)
+            pipeline.run_from_document(documentos[pessoa], output_path)
             end = timeit.default_timer()
-            print(f'\nELAPSED TIME: {round(end-start,2)}s\n')
\ No newline at end of file
+            print(f'\nELAPSED TIME: {round(end-start,2)}s\n')
+
+    metricas = gerenciador.metricas()
+    print(f"Modelos: {metricas['carregamentos']} cargas ({metricas['tempo_carga_s']:.1f}s), {metricas['despejos']} liberados")
\ No newline at end of file